@@ -1,8 +1,31 @@
 import sqlite3
 import functools
+import sys
+import time
 from datetime import datetime
 
-def log_queries(func):
+import query_profiler
+
+def _bind_params(args, kwargs):
+    # bind params follow the query, by keyword or positionally
+    if 'params' in kwargs:
+        return kwargs['params']
+    rest = args if 'query' in kwargs else args[1:]
+    if len(rest) == 1 and isinstance(rest[0], (tuple, list, dict)):
+        return rest[0]
+    return tuple(rest)
+
+def log_queries(func=None, profiler=query_profiler.profiler, database=None):
+    """Print each query and profile a sample of executions.
+
+    Sampled calls record wall time, rows returned and the caller into
+    ``profiler``; with sampling off only the print is added. Slow queries
+    are explained on ``database`` (the sqlite3 connection or path ``func``
+    queries), or on a pooled connection when it is not given.
+    """
+    if func is None:
+        return functools.partial(log_queries, profiler=profiler, database=database)
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         # Extract the query from kwargs or args
@@ -10,12 +33,21 @@ def log_queries(func):
         
         if query:
             print(f"Executing SQL Query: {query}")
-        
-        return func(*args, **kwargs)
+
+        if not query or not profiler.sampled():
+            return func(*args, **kwargs)
+
+        caller = sys._getframe(1)
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        profiler.record(query, time.perf_counter() - start, query_profiler.count_rows(result),
+                        f"{caller.f_code.co_filename}:{caller.f_lineno} in {caller.f_code.co_name}",
+                        _bind_params(args, kwargs), database)
+        return result
     
     return wrapper
 
-@log_queries
+@log_queries(database='users.db')
 def fetch_all_users(query):
     conn = sqlite3.connect('users.db')
     cursor = conn.cursor()
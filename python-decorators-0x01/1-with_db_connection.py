@@ -1,19 +1,4 @@
-import sqlite3 
-import functools
-
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Open database connection
-        conn = sqlite3.connect('users.db')
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-    
-    return wrapper
-
+from db_connection import with_db_connection
 
 @with_db_connection 
 def get_user_by_id(conn, user_id): 
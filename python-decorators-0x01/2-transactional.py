@@ -1,29 +1,35 @@
-import sqlite3 
 import functools
+from db_connection import tracing, with_db_connection
+from query_cache import notify_committed, tables_written
 
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-    
-    return wrapper
+def transactional(func=None, group=None):
+    """Commit ``func`` on success and roll back on error.
 
+    With ``group`` (a group_commit.GroupCommitter) calls share group
+    transactions instead; the committer then supplies the connection.
+    Statements are traced through db_connection.tracing(), so a trace
+    callback already set on a pooled connection keeps running.
+    """
+    if func is None:
+        return functools.partial(transactional, group=group)
+    if group is not None:
+        return group.transactional(func)
 
-def transactional(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
-        try:
-            result = func(conn, *args, **kwargs)
-            conn.commit()
-            return result
-        except Exception as e:
-            conn.rollback()
-            raise  # Re-raise the exception after rollback
+        # note every table written so dependent cached queries can be dropped
+        written = set()
+        with tracing(conn, lambda statement: written.update(tables_written(statement))):
+            try:
+                result = func(conn, *args, **kwargs)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                raise  # Re-raise the exception after rollback
+
+        # only committed writes invalidate the cache, never rolled-back ones
+        notify_committed(written)
+        return result
     
     return wrapper
 
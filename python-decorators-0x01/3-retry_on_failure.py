@@ -1,39 +1,80 @@
+import asyncio
 import time
-import sqlite3 
 import functools
+from db_connection import with_db_connection
+from retry import Deadline, full_jitter, is_transient, retry_stats
 
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-    
-    return wrapper
+def retry_on_failure(retries=3, delay=2, max_delay=30, deadline=None, retry_on=is_transient,
+                     stats=retry_stats):
+    """Retry transient failures with exponential backoff and full jitter.
 
-
-def retry_on_failure(retries=3, delay=2):
+    ``retries`` is the total number of attempts and ``delay`` the base
+    backoff in seconds, doubling per attempt up to ``max_delay``.
+    ``deadline`` caps the seconds spent on one call across all attempts.
+    ``retry_on(exc)`` decides which errors are retried (by default only
+    "database is locked"/busy). Coroutine functions sleep with asyncio.sleep.
+    """
     def decorator(func):
+        def backoff(attempt, e, budget):
+            # seconds to sleep before the next attempt, or why to stop
+            print(f"Attempt {attempt} failed: {e}")
+            if not retry_on(e):
+                print("Not retrying: error is not transient.")
+                return None, 'not_retryable'
+            if attempt >= retries:
+                print(f"All {retries} attempts failed.")
+                return None, 'exhausted'
+            sleep = full_jitter(attempt, delay, max_delay)
+            remaining = budget.remaining()
+            if remaining is not None:
+                if remaining <= 0:
+                    print(f"Retry deadline of {deadline} seconds reached.")
+                    return None, 'deadline'
+                # use what is left of the budget rather than giving it up
+                sleep = min(sleep, remaining)
+            print(f"Retrying in {sleep:.2f} seconds...")
+            return sleep, None
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                budget = Deadline(deadline)
+                attempt = 0
+                while True:
+                    attempt += 1
+                    try:
+                        result = await func(*args, **kwargs)
+                    except Exception as e:
+                        sleep, outcome = backoff(attempt, e, budget)
+                        if outcome:
+                            stats.record(attempt, time.perf_counter() - start, outcome)
+                            raise
+                        await asyncio.sleep(sleep)
+                    else:
+                        stats.record(attempt, time.perf_counter() - start, 'success')
+                        return result
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            budget = Deadline(deadline)
             attempt = 0
-            while attempt < retries:
+            while True:
+                attempt += 1
                 try:
                     result = func(*args, **kwargs)
-                    return result
                 except Exception as e:
-                    attempt += 1
-                    print(f"Attempt {attempt} failed: {e}")
-                    
-                    if attempt < retries:
-                        print(f"Retrying in {delay} seconds...")
-                        time.sleep(delay)
-                    else:
-                        print(f"All {retries} attempts failed.")
-                        raise 
+                    sleep, outcome = backoff(attempt, e, budget)
+                    if outcome:
+                        stats.record(attempt, time.perf_counter() - start, outcome)
+                        raise
+                    time.sleep(sleep)
+                else:
+                    stats.record(attempt, time.perf_counter() - start, 'success')
+                    return result
             
         return wrapper
     return decorator
@@ -1,36 +1,38 @@
 import time
-import sqlite3 
 import functools
+from db_connection import with_db_connection
+from query_cache import QueryCache, make_key, tables_read
 
 
-query_cache = {}
+query_cache = QueryCache(max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300)
 
-def with_db_connection(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        conn = sqlite3.connect('users.db')
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-    
-    return wrapper
+def cache_query(func=None, serve_stale=False):
+    """Cache results in query_cache; usable as @cache_query or @cache_query(...).
 
+    Concurrent misses for the same query run it once and share the result.
+    With serve_stale, callers get the expired result while it is refreshed.
+    """
+    if func is None:
+        return functools.partial(cache_query, serve_stale=serve_stale)
 
-def cache_query(func):
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
         query = kwargs.get('query') or (args[0] if args else None)
-        
-        if query in query_cache:
+        # bind parameters are part of the key, not just the SQL text
+        params = {k: v for k, v in kwargs.items() if k != 'query'}
+        key = make_key(query, args[1:] if 'query' not in kwargs else args, params)
+
+        executed = []
+
+        def run():
+            print("Executing query and caching result:", query)
+            executed.append(True)
+            return func(conn, *args, **kwargs)
+
+        result = query_cache.get_or_compute(key, run, tables=tables_read(query),
+                                            serve_stale=serve_stale)
+        if not executed:
             print("Using cached result for query:", query)
-            return query_cache[query]
-        
-        print("Executing query and caching result:", query)
-        result = func(conn, *args, **kwargs)
-        
-        query_cache[query] = result
         
         return result
     
@@ -0,0 +1,185 @@
+import asyncio
+from contextlib import contextmanager
+
+from db_connection import with_db_connection
+
+_UNSET = object()
+
+
+class _Pending:
+    """Result of one BatchLoader.load(); ``value`` dispatches if needed."""
+
+    __slots__ = ('_loader', '_value', '_error')
+
+    def __init__(self, loader):
+        self._loader = loader
+        self._value = _UNSET
+        self._error = None
+
+    @property
+    def value(self):
+        if self._value is _UNSET and self._error is None:
+            self._loader.dispatch()
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+
+def _chunks(keys, size):
+    for start in range(0, len(keys), size):
+        yield keys[start:start + size]
+
+
+class BatchLoader:
+    """Coalesces point lookups into one batch_fn(keys) call (DataLoader style).
+
+    ``batch_fn`` takes a list of distinct keys and returns a mapping of key
+    to value; keys it leaves out load as None. load() queues a key and
+    returns a handle whose ``value`` is filled in when the queue is
+    dispatched: on leaving a batch() scope, or on first access. Every key
+    is fetched once per loader, so use one loader per request.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=500):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._memo = {}
+        self._queue = []
+        self.batches = 0
+
+    def load(self, key):
+        pending = self._memo.get(key)
+        if pending is None:
+            pending = self._memo[key] = _Pending(self)
+            self._queue.append(key)
+        return pending
+
+    def load_many(self, keys):
+        """Values for ``keys`` in order, fetched in as few batches as possible."""
+        pending = [self.load(key) for key in keys]
+        self.dispatch()
+        return [p.value for p in pending]
+
+    def dispatch(self):
+        queue, self._queue = self._queue, []
+        for keys in _chunks(queue, self.max_batch_size):
+            self.batches += 1
+            try:
+                values = self.batch_fn(keys)
+                resolved = [values.get(key) for key in keys]
+            except Exception as e:
+                for key in keys:
+                    # failures are not memoized, so the next load retries
+                    self._memo.pop(key)._error = e
+                continue
+            for key, value in zip(keys, resolved):
+                self._memo[key]._value = value
+
+    @contextmanager
+    def batch(self):
+        """Defer every load() inside the block to one dispatch at its end."""
+        try:
+            yield self
+        finally:
+            self.dispatch()
+
+    def clear(self, key=_UNSET):
+        """Forget ``key`` (or every key) so it is fetched again."""
+        if key is _UNSET:
+            self._memo = {key: p for key, p in self._memo.items() if p._value is _UNSET}
+        elif key not in self._queue:
+            self._memo.pop(key, None)
+
+
+class AsyncBatchLoader:
+    """BatchLoader for asyncio: loads awaited in one tick share a batch.
+
+    Keys requested before the event loop gets back to the dispatch
+    callback are fetched together; ``window`` (seconds) waits a little
+    longer to collect more. A plain ``batch_fn`` runs in the default
+    executor so the loop is never blocked; a coroutine function is awaited.
+    """
+
+    def __init__(self, batch_fn, max_batch_size=500, window=0.0):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._memo = {}
+        self._queue = []
+        self._scheduled = False
+        self._tasks = set()
+        self.batches = 0
+
+    async def load(self, key):
+        future = self._memo.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._memo[key] = loop.create_future()
+            self._queue.append(key)
+            if not self._scheduled:
+                self._scheduled = True
+                if self.window:
+                    loop.call_later(self.window, self._dispatch)
+                else:
+                    loop.call_soon(self._dispatch)
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys):
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        self._scheduled = False
+        queue, self._queue = self._queue, []
+        for keys in _chunks(queue, self.max_batch_size):
+            self.batches += 1
+            # the loop only keeps weak references to tasks
+            task = asyncio.ensure_future(self._run(keys))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, keys):
+        try:
+            if asyncio.iscoroutinefunction(self.batch_fn):
+                values = await self.batch_fn(keys)
+            else:
+                values = await asyncio.get_running_loop().run_in_executor(
+                    None, self.batch_fn, keys)
+            resolved = [values.get(key) for key in keys]
+        except BaseException as e:
+            for key in keys:
+                future = self._memo.pop(key)
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                else:
+                    future.cancel()
+            if not isinstance(e, Exception):
+                raise
+            return
+        for key, value in zip(keys, resolved):
+            self._memo[key].set_result(value)
+
+    def clear(self, key=_UNSET):
+        if key is _UNSET:
+            self._memo = {key: f for key, f in self._memo.items() if not f.done()}
+        elif key in self._memo and self._memo[key].done():
+            del self._memo[key]
+
+
+@with_db_connection
+def fetch_users_by_ids(conn, ids):
+    """Rows of ``users`` for ``ids`` with one IN query, keyed by id."""
+    cursor = conn.cursor()
+    placeholders = ', '.join('?' * len(ids))
+    cursor.execute(f"SELECT * FROM users WHERE id IN ({placeholders})", list(ids))
+    return {row[0]: row for row in cursor.fetchall()}
+
+
+def user_loader():
+    """A per-request loader for get_user_by_id-style lookups."""
+    return BatchLoader(fetch_users_by_ids)
+
+
+def async_user_loader(window=0.0):
+    return AsyncBatchLoader(fetch_users_by_ids, window=window)
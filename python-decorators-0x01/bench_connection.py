@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Per-call overhead of connect-per-call against the pooled with_db_connection.
+
+Creates a temporary users.db, then times get_user_by_id() both ways.
+
+Usage: ./bench_connection.py [calls]
+"""
+import functools
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import db_connection
+
+
+def connect_per_call(database):
+    """The original decorator: a fresh connection for every call."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            conn = sqlite3.connect(database)
+            try:
+                return func(conn, *args, **kwargs)
+            finally:
+                conn.close()
+
+        return wrapper
+
+    return decorator
+
+
+def get_user_by_id(conn, user_id):
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+    return cursor.fetchone()
+
+
+def make_database(path, rows=10000):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                     ((f"User {i}", f"user{i}@example.com", i % 100) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def measure(lookup, calls):
+    lookup(user_id=1)
+    start = time.perf_counter()
+    for i in range(calls):
+        lookup(user_id=i % 10000 + 1)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'users.db')
+        make_database(path)
+        pool = db_connection.configure(path)
+
+        per_call = measure(connect_per_call(path)(get_user_by_id), calls)
+        pooled = measure(db_connection.with_db_connection(get_user_by_id), calls)
+        pool.close()
+
+    print(f"{calls} calls")
+    print(f"connect per call: {per_call:8.1f} us/call")
+    print(f"pooled:           {pooled:8.1f} us/call  ({per_call / pooled:.1f}x)")
+    print(f"pool: {pool.stats()}")
+
+
+if __name__ == '__main__':
+    main()
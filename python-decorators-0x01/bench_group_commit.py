@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Updates/s of per-call commits against group commit.
+
+Runs update_user_email over a temporary users.db four ways: one
+transaction per call through the transactional decorator, from one
+thread and from concurrent callers, group commit fed by one thread
+through futures, and group commit with concurrent callers. Each is measured with
+synchronous=NORMAL and with synchronous=FULL (an fsync per commit).
+
+Usage: ./bench_group_commit.py [updates] [threads]
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import db_connection
+from group_commit import GroupCommitter
+
+
+def update_user_email(conn, user_id, new_email):
+    cursor = conn.cursor()
+    cursor.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+
+
+def make_database(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)",
+                     ((f"User {i}", f"user{i}@example.com", i % 100) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def per_call(updates, threads):
+    """The transactional decorator from 2-transactional: one commit per update."""
+    # imported here: the script runs its example update against the configured pool
+    with contextlib.redirect_stdout(io.StringIO()):
+        transactional = __import__('2-transactional').transactional
+    update = db_connection.with_db_connection(transactional(update_user_email))
+    if threads == 1:
+        for i in range(updates):
+            update(user_id=i + 1, new_email=f"new{i}@example.com")
+        return
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda i: update(i + 1, f"new{i}@example.com"), range(updates)))
+
+
+def group_futures(updates, threads):
+    with GroupCommitter(max_ops=500) as committer:
+        futures = [committer.submit(update_user_email, i + 1, f"new{i}@example.com")
+                   for i in range(updates)]
+        for future in futures:
+            future.result()
+    return committer.stats()
+
+
+def group_threads(updates, threads):
+    with GroupCommitter(max_ops=500) as committer:
+        update = committer.transactional(update_user_email)
+        with ThreadPoolExecutor(threads) as executor:
+            list(executor.map(lambda i: update(i + 1, f"new{i}@example.com"), range(updates)))
+    return committer.stats()
+
+
+def main():
+    updates = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    for synchronous in ('NORMAL', 'FULL'):
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'users.db')
+            make_database(path, updates)
+            pool = db_connection.configure(path, synchronous=synchronous)
+            for name, run, workers in (('per-call commit', per_call, 1),
+                                       (f'per-call commit, {threads} threads', per_call, threads),
+                                       ('group commit, futures', group_futures, 1),
+                                       (f'group commit, {threads} threads', group_threads, threads)):
+                start = time.perf_counter()
+                stats = run(updates, workers)
+                elapsed = time.perf_counter() - start
+                extra = f"  ({stats['ops_per_batch']:.0f} updates/commit)" if stats else ''
+                print(f"synchronous={synchronous:<6} {name:<28} "
+                      f"{updates / elapsed:>10.0f} updates/s{extra}")
+            pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import functools
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class TracedConnection(sqlite3.Connection):
+    """sqlite3 connection that remembers its trace callback.
+
+    sqlite3 offers no way to read the callback back, so tracing() could
+    otherwise only replace it.
+    """
+
+    trace_callback = None
+
+    def set_trace_callback(self, callback):
+        super().set_trace_callback(callback)
+        self.trace_callback = callback
+
+
+@contextmanager
+def tracing(conn, callback):
+    """Call ``callback`` for every statement on ``conn`` inside the block.
+
+    A callback already installed on a TracedConnection (every pooled
+    connection is one) keeps being called and is restored afterwards. On
+    a plain sqlite3 connection any earlier callback is replaced and then
+    cleared, since it cannot be read back.
+    """
+    previous = getattr(conn, 'trace_callback', None)
+    if previous is None:
+        conn.set_trace_callback(callback)
+    else:
+        def chained(statement):
+            previous(statement)
+            callback(statement)
+
+        conn.set_trace_callback(chained)
+    try:
+        yield conn
+    finally:
+        conn.set_trace_callback(previous)
+
+
+class SQLitePool:
+    """Thread-aware pool of tuned sqlite3 connections to one database file.
+
+    Connections are opened with WAL journaling, synchronous=NORMAL (or
+    ``synchronous``), a larger page cache and mmap I/O, and are kept open between calls so
+    their page cache and compiled-statement cache survive. A thread gets
+    back the connection it used last when that one is idle.
+    """
+
+    def __init__(self, database='users.db', max_idle=8, cache_kib=16384,
+                 mmap_bytes=64 * 1024 * 1024, cached_statements=256, synchronous='NORMAL'):
+        if synchronous.upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+            raise ValueError(f"invalid synchronous setting: {synchronous!r}")
+        self.database = database
+        self.max_idle = max_idle
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+        self.cached_statements = cached_statements
+        self.synchronous = synchronous.upper()
+        self._lock = threading.Lock()
+        self._inherited = []
+        self._idle = []
+        self._reset()
+
+    def _reset(self):
+        # keep the parent's connections referenced so they are never closed here
+        self._inherited.extend(conn for _, conn in self._idle)
+        self._pid = os.getpid()
+        self._idle = []
+        self.created = 0
+        self.checkouts = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               cached_statements=self.cached_statements,
+                               factory=TracedConnection)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def acquire(self):
+        thread = threading.get_ident()
+        with self._lock:
+            if self._pid != os.getpid():
+                # sqlite connections must not cross fork()
+                self._reset()
+            self.checkouts += 1
+            for i in range(len(self._idle) - 1, -1, -1):
+                if self._idle[i][0] == thread:
+                    return self._idle.pop(i)[1]
+            if self._idle:
+                return self._idle.pop()[1]
+            self.created += 1
+        return self._connect()
+
+    def release(self, conn):
+        if self._pid != os.getpid():
+            # borrowed before fork(): the parent still owns it
+            with self._lock:
+                self._inherited.append(conn)
+            return
+        try:
+            if conn.in_transaction:
+                # uncommitted work is discarded, as closing the connection did
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            return
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append((threading.get_ident(), conn))
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            idle, self._idle = self._idle, []
+        for _, conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {'created': self.created, 'checkouts': self.checkouts, 'idle': len(self._idle)}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure(database=None, **options):
+    """Point the shared pool at ``database`` (default: $USERS_DB or users.db).
+
+    ``options`` are passed to SQLitePool. Idle connections of the previous
+    pool are closed.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = SQLitePool(database or os.getenv('USERS_DB', 'users.db'), **options)
+    return _pool
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SQLitePool(os.getenv('USERS_DB', 'users.db'))
+        return _pool
+
+
+def with_db_connection(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # Borrow a pooled connection instead of opening one per call
+        with get_pool().connection() as conn:
+            return func(conn, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,199 @@
+import functools
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from db_connection import get_pool, tracing
+from query_cache import notify_committed, tables_written
+
+_STOP = object()
+
+
+class GroupCommitter:
+    """Runs transactional writes from many callers in shared transactions.
+
+    A writer thread takes every operation that queued while it was busy
+    (up to ``max_ops``), runs each inside its own SAVEPOINT of a single
+    transaction and commits once, so the whole group pays for one commit
+    (and one fsync). It never waits on an empty queue unless ``window``
+    (seconds) asks it to hold a group open a little for more callers. An
+    operation that raises is rolled back to its savepoint; only its caller
+    sees the error. Tables written by committed
+    operations are passed to notify_committed() after the commit.
+    """
+
+    def __init__(self, window=0.0, max_ops=100, pool=None):
+        self.window = window
+        self.max_ops = max_ops
+        self._pool = pool
+        self._queue = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._owner = None
+        self._conn = None
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+
+    def _start(self):
+        # caller holds the lock
+        if self._thread is not None and not self._thread.is_alive():
+            # the writer died; drop its connection and start a fresh one
+            self._thread = None
+            self._conn.close()
+        if self._thread is None:
+            # each writer gets its own queue, so a restart never shares one
+            self._queue = queue.Queue()
+            self._owner = self._pool or get_pool()
+            self._conn = self._owner.acquire()
+            self._thread = threading.Thread(target=self._run, args=(self._queue, self._conn),
+                                            name='group-commit', daemon=True)
+            self._thread.start()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue ``func(conn, *args, **kwargs)``; returns a Future of its result."""
+        future = Future()
+        with self._lock:
+            self._start()
+            self._queue.put((func, args, kwargs, future))
+        return future
+
+    def run(self, func, *args, **kwargs):
+        if threading.current_thread() is self._thread:
+            # a grouped write calling another one joins the current transaction
+            return func(self._conn, *args, **kwargs)
+        return self.submit(func, *args, **kwargs).result()
+
+    def transactional(self, func):
+        """Decorator: calls block until their group has committed.
+
+        The committer passes its own connection, so do not also wrap the
+        function with with_db_connection.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return self.run(func, *args, **kwargs)
+
+        return wrapper
+
+    def _run(self, ops, conn):
+        stopping = False
+        while not stopping:
+            first = ops.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_ops:
+                # whatever queued during the previous commit joins this group;
+                # once the queue is empty only a positive window waits for more
+                try:
+                    op = ops.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        op = ops.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if op is _STOP:
+                    stopping = True
+                    break
+                batch.append(op)
+            self._commit(conn, batch)
+
+    def _commit(self, conn, batch):
+        try:
+            self._commit_batch(conn, batch)
+        except BaseException as e:
+            # a broken transaction-control statement must not kill the writer:
+            # fail whatever is still unresolved and start the next group clean
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            for *_, future in batch:
+                if future.running() or (not future.done()
+                                         and future.set_running_or_notify_cancel()):
+                    future.set_exception(e)
+
+    def _commit_batch(self, conn, batch):
+        done = []
+        written = set()
+        try:
+            conn.execute("BEGIN")
+        except Exception as e:
+            # e.g. "database is locked" by another writer: the group fails together
+            for *_, future in batch:
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(e)
+            return
+        for func, args, kwargs, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            tables = set()
+            # ops run one at a time, so one savepoint name serves them all and
+            # its statements stay in sqlite's statement cache
+            conn.execute("SAVEPOINT group_op")
+            try:
+                with tracing(conn, lambda statement: tables.update(tables_written(statement))):
+                    result = func(conn, *args, **kwargs)
+                if not conn.in_transaction:
+                    raise RuntimeError(
+                        f"{getattr(func, '__name__', func)!r} ended the group transaction; "
+                        "group-committed functions must not commit or roll back")
+            except BaseException as e:
+                if not conn.in_transaction:
+                    # the savepoints are gone with the transaction; fail the group
+                    raise
+                # only this operation is undone; the rest of the group stays
+                conn.execute("ROLLBACK TO group_op")
+                conn.execute("RELEASE group_op")
+                self.failed += 1
+                future.set_exception(e)
+            else:
+                conn.execute("RELEASE group_op")
+                written |= tables
+                done.append((future, result))
+
+        try:
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            for future, _ in done:
+                future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.operations += len(batch)
+
+        notify_committed(written)
+        for future, result in done:
+            future.set_result(result)
+
+    def close(self):
+        """Commit what is queued, stop the writer and return its connection."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            owner, conn, self._conn = self._owner, self._conn, None
+        thread.join()
+        owner.release(conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'operations': self.operations,
+            'failed': self.failed,
+            'ops_per_batch': self.operations / self.batches if self.batches else 0.0,
+        }
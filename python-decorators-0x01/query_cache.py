@@ -0,0 +1,326 @@
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+_IDENTIFIER = r'[`"\[]?([A-Za-z_][\w.]*)[`"\]]?'
+_WRITE_TABLES = re.compile(
+    r'^\s*(?:UPDATE(?:\s+OR\s+\w+)?|(?:INSERT|REPLACE)(?:\s+OR\s+\w+)?\s+INTO|DELETE\s+FROM)\s+'
+    + _IDENTIFIER, re.IGNORECASE)
+
+# a read or write the parsers cannot fully account for is tagged with
+# WILDCARD, so it is invalidated by (or invalidates) every commit
+WILDCARD = '*'
+# version bumped by wildcard writes; every snapshot includes it
+_EVERYTHING = '**'
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_FROM_CLAUSE = re.compile(
+    r'\bFROM\b(.*?)(?=\b(?:WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT|HAVING|WINDOW|UNION|EXCEPT'
+    r'|INTERSECT)\b|;|$)', re.IGNORECASE | re.DOTALL)
+_JOIN = re.compile(r',|\b(?:NATURAL\s+)?(?:(?:LEFT|RIGHT|FULL)(?:\s+OUTER)?\s+|INNER\s+|CROSS\s+)?JOIN\b',
+                   re.IGNORECASE)
+_JOIN_CONDITION = re.compile(r'\b(?:ON|USING)\b.*', re.IGNORECASE | re.DOTALL)
+_TABLE_REF = re.compile(r'^\s*' + _IDENTIFIER + r'(?:\s+(?:AS\s+)?[`"\[]?\w+[`"\]]?)?\s*$',
+                        re.IGNORECASE)
+_NO_WRITES = re.compile(r'^\s*(?:SELECT|BEGIN|COMMIT|END|ROLLBACK|SAVEPOINT|RELEASE|EXPLAIN)\b',
+                        re.IGNORECASE)
+
+# every live cache, so a commit anywhere in the process can invalidate them
+_caches = weakref.WeakSet()
+
+
+def _hashable(value):
+    # lists/dicts/sets as bind params would make the key unhashable
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted(((key, _hashable(item)) for key, item in value.items()), key=repr))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_hashable(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def make_key(query, args=(), kwargs=None):
+    """Cache key for a query together with its bind parameters."""
+    return (query, _hashable(tuple(args)), _hashable(kwargs or {}))
+
+
+def estimate_size(value):
+    """Approximate bytes held by a query result (lists/tuples of rows)."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item) for item in value)
+    return size
+
+
+def tables_read(query):
+    """Lower-cased names of the tables a SELECT reads from.
+
+    Every table of a comma or JOIN list is included. Queries the parser
+    cannot fully account for (CTEs, subqueries, anything but a SELECT)
+    also get WILDCARD, so any commit invalidates them.
+    """
+    query = _STRING_LITERAL.sub("''", query or '')
+    tables = set()
+    if not re.match(r'\s*SELECT\b', query, re.IGNORECASE) or re.search(
+            r'\(\s*(?:SELECT|WITH)\b', query, re.IGNORECASE):
+        tables.add(WILDCARD)
+    for clause in _FROM_CLAUSE.findall(query):
+        for item in _JOIN.split(clause):
+            match = _TABLE_REF.match(_JOIN_CONDITION.sub('', item))
+            if match:
+                tables.add(match.group(1).lower())
+            else:
+                tables.add(WILDCARD)
+    return tables
+
+
+def tables_written(statement):
+    """Lower-cased name of the table an INSERT/UPDATE/DELETE writes to.
+
+    Reads and transaction control write nothing; any other statement
+    (DDL, CTE writes, ...) returns WILDCARD so its commit clears every cache.
+    """
+    statement = statement or ''
+    match = _WRITE_TABLES.match(statement)
+    if match:
+        return {match.group(1).lower()}
+    if not statement.strip() or _NO_WRITES.match(statement):
+        return set()
+    return {WILDCARD}
+
+
+def notify_committed(tables):
+    """Drop cached results that read any of ``tables`` from every cache.
+
+    Call this only after the writing transaction has committed.
+    """
+    tables = {table.lower() for table in tables}
+    if not tables:
+        return
+    for cache in list(_caches):
+        cache.invalidate_tables(tables)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires', 'tables')
+
+    def __init__(self, value, size, expires, tables):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.tables = tables
+
+
+class _Flight:
+    """One in-progress computation that concurrent callers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryCache:
+    """Thread-safe LRU cache for query results with a TTL per entry.
+
+    Bounded by both ``max_entries`` and ``max_bytes``; the least recently
+    used entries are evicted first. ``ttl`` is the default lifetime in
+    seconds (None means entries never expire). Entries can name the tables
+    they were read from so commits to those tables invalidate them.
+    get_or_compute() lets concurrent misses for one key share one
+    computation.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._by_table = {}
+        self._versions = {}
+        self._flights = {}
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        _caches.add(self)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry.expires is not None and entry.expires <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and (entry.expires is None or entry.expires > time.monotonic())
+
+    def get_or_compute(self, key, compute, tables=(), ttl=None, serve_stale=False):
+        """Return the cached value for ``key`` or compute it exactly once.
+
+        While one caller runs ``compute()``, other callers for the same key
+        wait and receive its result or its exception. With ``serve_stale``
+        they get the expired value instead of waiting, if there is one.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            now = time.monotonic()
+            if entry is not None and (entry.expires is None or entry.expires > now):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+
+            flight = self._flights.get(key)
+            if flight is not None and serve_stale and entry is not None:
+                self.stale_hits += 1
+                return entry.value
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                leader = True
+                self.misses += 1
+                read_at = self.snapshot(tables)
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+            self.set(key, flight.value, ttl=ttl, tables=tables, read_at=read_at)
+            return flight.value
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def snapshot(self, tables):
+        """Versions of ``tables``; pass to set() as ``read_at``."""
+        with self._lock:
+            versions = {table.lower(): self._versions.get(table.lower(), 0) for table in tables}
+            versions[_EVERYTHING] = self._versions.get(_EVERYTHING, 0)
+            return versions
+
+    def set(self, key, value, ttl=None, tables=(), read_at=None):
+        """Store ``value``; results larger than max_bytes are not cached.
+
+        ``tables`` are the tables the result was read from. If ``read_at``
+        (from snapshot() taken before the query ran) shows that one of them
+        was invalidated since, the result may be stale and is not stored.
+        """
+        tables = frozenset(table.lower() for table in tables)
+        size = estimate_size(value)
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if read_at and any(self._versions.get(table, 0) != version
+                               for table, version in read_at.items()):
+                return False
+            if size > self.max_bytes:
+                return False
+            self._entries[key] = _Entry(value, size, expires, tables)
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that read from one of ``tables``.
+
+        Entries tagged WILDCARD go on any invalidation; WILDCARD among
+        ``tables`` drops everything.
+        """
+        tables = {table.lower() for table in tables}
+        if not tables:
+            return
+        with self._lock:
+            if WILDCARD in tables:
+                self._versions[_EVERYTHING] = self._versions.get(_EVERYTHING, 0) + 1
+                self.invalidations += len(self._entries)
+                self.clear()
+                return
+            for table in tables | {WILDCARD}:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                for key in list(self._by_table.get(table, ())):
+                    if key in self._entries:
+                        self._remove(key)
+                        self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        # caller holds the lock
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'coalesced': self.coalesced,
+                'stale_hits': self.stale_hits,
+            }
@@ -0,0 +1,193 @@
+import os
+import random
+import re
+import sqlite3
+import sys
+import threading
+from collections import Counter
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_SPACE = re.compile(r'\s+')
+
+
+def normalize(query):
+    """Query text with literals replaced by ``?``, so similar queries group."""
+    query = _STRING.sub('?', query)
+    query = _NUMBER.sub('?', query)
+    query = _IN_LIST.sub('IN (?)', query)
+    return _SPACE.sub(' ', query).strip()
+
+
+class LatencyHistogram:
+    """Latencies in power-of-two microsecond buckets (bucket i < 2**i us)."""
+
+    __slots__ = ('buckets', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * 40
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, seconds):
+        index = min(int(seconds * 1e6).bit_length(), len(self.buckets) - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def percentile(self, q):
+        """Upper bound in seconds of the bucket holding quantile ``q`` (0..1)."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min((1 << index) / 1e6, self.max)
+        return self.max
+
+
+class QueryProfile:
+    """Everything recorded for one normalized query."""
+
+    def __init__(self, query):
+        self.query = query
+        self.calls = 0
+        self.rows = 0
+        self.latency = LatencyHistogram()
+        self.callers = Counter()
+        self.slow = []
+
+    def to_dict(self):
+        latency = self.latency
+        return {
+            'query': self.query,
+            'calls': self.calls,
+            'rows': self.rows,
+            'total_seconds': latency.total,
+            'mean_seconds': latency.total / self.calls if self.calls else 0.0,
+            'p50_seconds': latency.percentile(0.5),
+            'p99_seconds': latency.percentile(0.99),
+            'max_seconds': latency.max,
+            'callers': self.callers.most_common(3),
+            'slow': list(self.slow),
+        }
+
+
+def explain_query_plan(query, params=(), database=None):
+    """EXPLAIN QUERY PLAN rows for ``query``.
+
+    ``database`` is the sqlite3 connection or path the query ran against;
+    without one a pooled connection is used.
+    """
+    sql = f"EXPLAIN QUERY PLAN {query}"
+    if isinstance(database, sqlite3.Connection):
+        return database.execute(sql, params).fetchall()
+    if database is not None:
+        conn = sqlite3.connect(database)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    from db_connection import get_pool
+
+    with get_pool().connection() as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+class QueryProfiler:
+    """Samples query executions into per-normalized-query statistics.
+
+    ``sample_rate`` is the fraction of calls measured (0 turns profiling
+    off). Sampled calls taking at least ``slow_threshold`` seconds keep
+    their text, caller and EXPLAIN QUERY PLAN, up to ``max_slow`` per query.
+    """
+
+    def __init__(self, sample_rate=0.0, slow_threshold=None, explain=explain_query_plan,
+                 max_slow=10):
+        self.sample_rate = sample_rate
+        self.slow_threshold = slow_threshold
+        self.explain = explain
+        self.max_slow = max_slow
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def sampled(self):
+        rate = self.sample_rate
+        return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+    def record(self, query, seconds, rows=0, caller=None, params=(), database=None):
+        """Add one execution; ``database`` is where a slow query is explained."""
+        plan = None
+        slow = self.slow_threshold is not None and seconds >= self.slow_threshold
+        if slow and self.explain is not None:
+            try:
+                if database is None:
+                    plan = self.explain(query, params)
+                else:
+                    plan = self.explain(query, params, database)
+            except sqlite3.Error as e:
+                plan = f"EXPLAIN failed: {e}"
+
+        key = normalize(query)
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = QueryProfile(key)
+            profile.calls += 1
+            profile.rows += rows
+            profile.latency.add(seconds)
+            if caller:
+                profile.callers[caller] += 1
+            if slow and len(profile.slow) < self.max_slow:
+                profile.slow.append({'query': query, 'seconds': seconds,
+                                     'caller': caller, 'plan': plan})
+
+    def top(self, n=10, by='total_seconds'):
+        """The ``n`` heaviest queries as dicts, sorted by ``by`` descending."""
+        with self._lock:
+            profiles = [profile.to_dict() for profile in self._profiles.values()]
+        profiles.sort(key=lambda profile: profile[by] or 0, reverse=True)
+        return profiles[:n]
+
+    def dump(self, n=10, by='total_seconds', file=None):
+        """Print the top-``n`` queries as a table."""
+        file = file or sys.stdout
+        print(f"{'calls':>8} {'total ms':>10} {'mean ms':>9} {'p99 ms':>9} {'rows':>8}  query",
+              file=file)
+        for profile in self.top(n, by):
+            print(f"{profile['calls']:>8} {profile['total_seconds'] * 1e3:>10.2f} "
+                  f"{profile['mean_seconds'] * 1e3:>9.3f} {profile['p99_seconds'] * 1e3:>9.3f} "
+                  f"{profile['rows']:>8}  {profile['query']}", file=file)
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+def count_rows(result):
+    """Rows in a fetchall() list, a fetchone() row or None."""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def _env_float(name, default):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+# QUERY_PROFILE_RATE=0.01 QUERY_SLOW_MS=50 profiles 1% of calls in production
+profiler = QueryProfiler(
+    sample_rate=_env_float('QUERY_PROFILE_RATE', 0.0),
+    slow_threshold=_env_float('QUERY_SLOW_MS', 100.0) / 1e3,
+)
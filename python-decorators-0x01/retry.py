@@ -0,0 +1,92 @@
+import random
+import sqlite3
+import threading
+import time
+
+from query_profiler import LatencyHistogram
+
+# OperationalError messages that mean "try again", not "this query is wrong"
+TRANSIENT_MESSAGES = ('database is locked', 'database table is locked', 'database is busy')
+
+
+def is_transient(exc):
+    """Default classifier: retry only lock/busy contention errors."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    message = str(exc).lower()
+    return any(text in message for text in TRANSIENT_MESSAGES)
+
+
+def full_jitter(attempt, base, cap, rng=random):
+    """Sleep before retry ``attempt`` (1-based): uniform in [0, min(cap, base * 2**(attempt-1))].
+
+    Spreading retries over the whole window keeps callers that failed on
+    the same lock from retrying in lockstep.
+    """
+    return rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class Deadline:
+    """Overall time budget across all attempts; None means unlimited."""
+
+    def __init__(self, seconds):
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        return None if self.expires is None else self.expires - time.monotonic()
+
+
+class RetryStats:
+    """Thread-safe retry counters plus a latency histogram of whole calls.
+
+    Latency covers every attempt and backoff sleep of a call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = 0
+            self.attempts = 0
+            self.retries = 0
+            self.successes = 0
+            self.failures = 0
+            self.not_retryable = 0
+            self.deadline_exceeded = 0
+            self.latency = LatencyHistogram()
+
+    def record(self, attempts, seconds, outcome):
+        """``outcome`` is 'success', 'exhausted', 'not_retryable' or 'deadline'."""
+        with self._lock:
+            self.calls += 1
+            self.attempts += attempts
+            self.retries += attempts - 1
+            self.latency.add(seconds)
+            if outcome == 'success':
+                self.successes += 1
+                return
+            self.failures += 1
+            if outcome == 'not_retryable':
+                self.not_retryable += 1
+            elif outcome == 'deadline':
+                self.deadline_exceeded += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'successes': self.successes,
+                'failures': self.failures,
+                'not_retryable': self.not_retryable,
+                'deadline_exceeded': self.deadline_exceeded,
+                'p50_seconds': self.latency.percentile(0.5),
+                'p99_seconds': self.latency.percentile(0.99),
+                'max_seconds': self.latency.max,
+            }
+
+
+retry_stats = RetryStats()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the batch_loader module.
+
+Checks that point lookups coalesce into one batch call, repeated keys
+are fetched once, and failures reach every caller, both synchronously and
+under asyncio. batch_fn is a stub, so no database is needed.
+"""
+import asyncio
+import unittest
+
+from batch_loader import AsyncBatchLoader, BatchLoader
+
+
+class Recorder:
+    """batch_fn stub that records every batch of keys it receives."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, keys):
+        self.batches.append(list(keys))
+        if self.fail:
+            raise LookupError("backend down")
+        return {key: f"user-{key}" for key in keys if key != 404}
+
+
+class TestBatchLoader(unittest.TestCase):
+    """Synchronous batch scopes."""
+
+    def test_scope_coalesces_and_memoizes(self):
+        """Loads in one scope share a batch and repeated keys are fetched once."""
+        fetch = Recorder()
+        loader = BatchLoader(fetch)
+        with loader.batch():
+            pending = [loader.load(key) for key in (1, 2, 1, 404)]
+        self.assertEqual([p.value for p in pending], ['user-1', 'user-2', 'user-1', None])
+        self.assertEqual(loader.load_many([2, 3]), ['user-2', 'user-3'])
+        self.assertEqual(fetch.batches, [[1, 2, 404], [3]])
+
+    def test_max_batch_size(self):
+        """Queues longer than max_batch_size are split into several batches."""
+        fetch = Recorder()
+        loader = BatchLoader(fetch, max_batch_size=2)
+        loader.load_many(range(5))
+        self.assertEqual(fetch.batches, [[0, 1], [2, 3], [4]])
+
+    def test_bad_batch_result_raises_in_caller(self):
+        """A batch_fn result that is not a mapping fails the handles, not returns junk."""
+        loader = BatchLoader(lambda keys: [None] * len(keys))
+        with self.assertRaises(AttributeError):
+            loader.load(1).value
+
+    def test_errors_are_not_memoized(self):
+        """A failed key is fetched again by the next load."""
+        fetch = Recorder(fail=True)
+        loader = BatchLoader(fetch)
+        with self.assertRaises(LookupError):
+            loader.load(1).value
+        fetch.fail = False
+        self.assertEqual(loader.load(1).value, 'user-1')
+
+
+class TestAsyncBatchLoader(unittest.TestCase):
+    """Loads awaited in the same tick share one batch."""
+
+    def test_gathered_loads_share_a_batch(self):
+        """Loads gathered in one tick make a single batch call."""
+        fetch = Recorder()
+
+        async def run():
+            loader = AsyncBatchLoader(fetch)
+            first = await asyncio.gather(*(loader.load(key) for key in (3, 1, 3)))
+            second = await loader.load_many([1, 2])
+            return first, second
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first, ['user-3', 'user-1', 'user-3'])
+        self.assertEqual(second, ['user-1', 'user-2'])
+        self.assertEqual(fetch.batches, [[3, 1], [2]])
+
+    def test_failure_reaches_every_caller(self):
+        """A failing batch_fn raises in every awaiting caller."""
+        async def run():
+            loader = AsyncBatchLoader(Recorder(fail=True))
+            return await asyncio.gather(loader.load(1), loader.load(2),
+                                        return_exceptions=True)
+
+        for result in asyncio.run(run()):
+            self.assertIsInstance(result, LookupError)
+
+    def test_bad_batch_result_reaches_every_caller(self):
+        """A non-mapping batch result fails every awaiter instead of hanging."""
+        async def run():
+            loader = AsyncBatchLoader(lambda keys: list(keys))
+            return await asyncio.wait_for(
+                asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True), 5)
+
+        for result in asyncio.run(run()):
+            self.assertIsInstance(result, AttributeError)
+
+
+if __name__ == '__main__':
+    unittest.main()
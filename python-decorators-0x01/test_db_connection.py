@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the db_connection module.
+
+Covers statement tracing on pooled connections: tracing() chains to a
+callback the caller installed and restores it afterwards.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from db_connection import SQLitePool, tracing
+
+
+class TestTracing(unittest.TestCase):
+    """Wrappers share the trace hook instead of taking it over."""
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.pool = SQLitePool(os.path.join(self.workdir.name, 'users.db'))
+
+    def tearDown(self):
+        self.pool.close()
+        self.workdir.cleanup()
+
+    def test_existing_callback_is_chained_and_restored(self):
+        """The caller's callback sees traced statements and is put back after."""
+        mine, traced = [], []
+        with self.pool.connection() as conn:
+            conn.set_trace_callback(mine.append)
+            with tracing(conn, traced.append):
+                conn.execute("SELECT 1")
+            conn.execute("SELECT 2")
+            self.assertEqual(conn.trace_callback, mine.append)
+            conn.set_trace_callback(None)
+        self.assertEqual(traced, ["SELECT 1"])
+        self.assertEqual(mine, ["SELECT 1", "SELECT 2"])
+
+    def test_plain_connection_is_cleared(self):
+        """Without a known callback the hook is cleared after the block."""
+        traced = []
+        conn = sqlite3.connect(':memory:')
+        try:
+            with tracing(conn, traced.append):
+                conn.execute("SELECT 1")
+            conn.execute("SELECT 2")
+        finally:
+            conn.close()
+        self.assertEqual(traced, ["SELECT 1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the group_commit module against a temporary SQLite database.
+
+Checks that concurrent writes share commits, a failing operation is
+rolled back to its savepoint without undoing the rest of its group, and
+cached queries are invalidated once the group commits.
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from db_connection import SQLitePool
+from group_commit import GroupCommitter
+from query_cache import QueryCache
+
+
+def update_user_email(conn, user_id, new_email):
+    conn.execute("UPDATE users SET email = ? WHERE id = ?", (new_email, user_id))
+    if new_email == 'bad':
+        raise ValueError("rejected")
+
+
+class TestGroupCommitter(unittest.TestCase):
+    """Savepoint isolation, shared commits and cache invalidation."""
+
+    def setUp(self):
+        self.workdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.workdir.name, 'users.db')
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.executemany("INSERT INTO users (name, email) VALUES (?, ?)",
+                         ((f"u{i}", f"u{i}@x") for i in range(100)))
+        conn.commit()
+        conn.close()
+        self.pool = SQLitePool(self.path)
+
+    def tearDown(self):
+        self.pool.close()
+        self.workdir.cleanup()
+
+    def emails(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            return dict(conn.execute("SELECT id, email FROM users"))
+        finally:
+            conn.close()
+
+    def test_failure_only_undoes_its_own_operation(self):
+        """A failing op is rolled back to its savepoint; the rest commit."""
+        with GroupCommitter(window=0.05, pool=self.pool) as committer:
+            futures = [committer.submit(update_user_email, 1, 'one@x'),
+                       committer.submit(update_user_email, 2, 'bad'),
+                       committer.submit(update_user_email, 3, 'three@x')]
+            self.assertIsNone(futures[0].result())
+            self.assertIsInstance(futures[1].exception(), ValueError)
+            self.assertIsNone(futures[2].result())
+        self.assertEqual(committer.stats()['batches'], 1)
+        emails = self.emails()
+        self.assertEqual((emails[1], emails[2], emails[3]), ('one@x', 'u1@x', 'three@x'))
+
+    def test_operation_that_commits_fails_its_group_not_the_writer(self):
+        """An op ending the transaction fails its group; later groups still run."""
+        def commits_itself(conn, user_id):
+            conn.execute("UPDATE users SET email = 'x' WHERE id = ?", (user_id,))
+            conn.commit()
+
+        with GroupCommitter(window=0.05, pool=self.pool) as committer:
+            futures = [committer.submit(commits_itself, 1),
+                       committer.submit(update_user_email, 2, 'two@x')]
+            for future in futures:
+                self.assertIsInstance(future.exception(timeout=5), RuntimeError)
+            later = committer.submit(update_user_email, 3, 'three@x')
+            self.assertIsNone(later.result(timeout=5))
+        self.assertEqual(self.emails()[3], 'three@x')
+
+    def test_concurrent_callers_share_commits(self):
+        """Blocking callers on many threads share fewer commits than calls."""
+        with GroupCommitter(window=0.01, max_ops=50, pool=self.pool) as committer:
+            update = committer.transactional(update_user_email)
+            threads = [threading.Thread(target=update, args=(i + 1, f"new{i}@x"))
+                       for i in range(100)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        stats = committer.stats()
+        self.assertEqual(stats['operations'], 100)
+        self.assertLess(stats['batches'], 100)
+        self.assertEqual(self.emails()[100], 'new99@x')
+
+    def test_ops_queued_during_a_commit_form_the_next_group(self):
+        """Without a window the writer commits at once, then takes what queued meanwhile."""
+        started, release = threading.Event(), threading.Event()
+
+        def slow(conn):
+            started.set()
+            release.wait(5)
+
+        with GroupCommitter(pool=self.pool) as committer:
+            first = committer.submit(slow)
+            self.assertTrue(started.wait(5))
+            queued = [committer.submit(update_user_email, i + 1, f"new{i}@x") for i in range(5)]
+            release.set()
+            first.result(timeout=5)
+            for future in queued:
+                future.result(timeout=5)
+        self.assertEqual(committer.stats()['batches'], 2)
+
+    def test_commit_invalidates_cached_reads(self):
+        """A group commit drops cached results of the tables it wrote."""
+        cache = QueryCache()
+        cache.set('all', ['stale'], tables={'users'})
+        with GroupCommitter(pool=self.pool) as committer:
+            committer.run(update_user_email, 1, 'one@x')
+        self.assertNotIn('all', cache)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Unit and stress tests for the query_cache module.
+
+Covers LRU/TTL bounds, table invalidation and single-flight behaviour of
+QueryCache.get_or_compute under hundreds of concurrent threads, and a
+commit through the transactional decorator dropping cached reads.
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import db_connection
+from query_cache import (WILDCARD, QueryCache, make_key, notify_committed, tables_read,
+                         tables_written)
+
+THREADS = 300
+
+
+def hammer(cache, key, compute, **kwargs):
+    """Call get_or_compute from THREADS threads released at once."""
+    barrier = threading.Barrier(THREADS)
+    results, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(cache.get_or_compute(key, compute, **kwargs))
+        except Exception as err:
+            errors.append(err)
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test cases for QueryCache bounds and invalidation."""
+
+    def test_lru_eviction(self):
+        """The least recently used entry is evicted first."""
+        cache = QueryCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_ttl(self):
+        """Entries expire after their TTL."""
+        cache = QueryCache(ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get('a'))
+
+    def test_invalidate_tables(self):
+        """A commit drops only the entries that read the written table."""
+        cache = QueryCache()
+        cache.set('users', 1, tables={'users'})
+        cache.set('orders', 2, tables={'orders'})
+        notify_committed({'USERS'})
+        self.assertNotIn('users', cache)
+        self.assertIn('orders', cache)
+
+    def test_wildcard_entries_go_on_any_commit(self):
+        """Entries tagged WILDCARD are dropped by a write to any table."""
+        cache = QueryCache()
+        cache.set('unknown', 1, tables={WILDCARD})
+        cache.set('orders', 2, tables={'orders'})
+        notify_committed({'users'})
+        self.assertNotIn('unknown', cache)
+        self.assertIn('orders', cache)
+
+    def test_wildcard_write_drops_everything(self):
+        """A write the parser cannot name clears the cache and stale flights."""
+        cache = QueryCache()
+        cache.set('orders', 2, tables={'orders'})
+        read_at = cache.snapshot({'orders'})
+        notify_committed({WILDCARD})
+        self.assertNotIn('orders', cache)
+        self.assertFalse(cache.set('orders', 3, tables={'orders'}, read_at=read_at))
+
+
+class TestMakeKey(unittest.TestCase):
+    """Cache keys for every kind of bind parameter."""
+
+    def test_list_and_dict_params_are_hashable(self):
+        """List and dict params give hashable keys that tell values apart."""
+        query = "SELECT * FROM users WHERE id = :id"
+        key = make_key(query, ([1, 2],), {'params': {'id': 1, 'tags': ['a']}})
+        self.assertEqual(hash(key), hash(make_key(query, ([1, 2],),
+                                                  {'params': {'tags': ['a'], 'id': 1}})))
+        self.assertNotEqual(key, make_key(query, ([1, 2],), {'params': {'id': 2, 'tags': ['a']}}))
+        cache = QueryCache()
+        cache.set(key, 'rows')
+        self.assertEqual(cache.get(key), 'rows')
+
+
+class TestTables(unittest.TestCase):
+    """Table names parsed out of reads and writes."""
+
+    def test_every_table_of_a_from_list(self):
+        """Comma lists and every kind of JOIN contribute all their tables."""
+        self.assertEqual(tables_read("SELECT * FROM users"), {'users'})
+        self.assertEqual(tables_read("SELECT * FROM users u, Orders AS o WHERE o.user_id = u.id"),
+                         {'users', 'orders'})
+        self.assertEqual(tables_read("SELECT * FROM users u LEFT OUTER JOIN orders o "
+                                     "ON o.user_id = u.id JOIN items USING (order_id) LIMIT 5"),
+                         {'users', 'orders', 'items'})
+
+    def test_literals_are_not_tables(self):
+        """FROM inside a string literal is not parsed."""
+        self.assertEqual(tables_read("SELECT * FROM users WHERE name = 'a FROM b, c'"), {'users'})
+
+    def test_unparsed_reads_fail_closed(self):
+        """Subqueries, CTEs and unknown table expressions get WILDCARD."""
+        self.assertIn(WILDCARD, tables_read("SELECT * FROM (SELECT * FROM users)"))
+        self.assertIn(WILDCARD, tables_read("SELECT * FROM users WHERE id IN "
+                                            "(SELECT user_id FROM orders)"))
+        self.assertIn(WILDCARD, tables_read("WITH t AS (SELECT 1) SELECT * FROM t"))
+        self.assertIn(WILDCARD, tables_read("PRAGMA table_info(users)"))
+
+    def test_tables_written(self):
+        """DML names its table, control statements none, anything else WILDCARD."""
+        self.assertEqual(tables_written("INSERT OR REPLACE INTO orders VALUES (?)"), {'orders'})
+        self.assertEqual(tables_written("COMMIT"), set())
+        self.assertEqual(tables_written("SELECT 1"), set())
+        self.assertEqual(tables_written("DROP TABLE orders"), {WILDCARD})
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Stress tests for QueryCache.get_or_compute."""
+
+    def test_concurrent_misses_compute_once(self):
+        """Hundreds of simultaneous misses share a single computation."""
+        cache = QueryCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return [('row',)]
+
+        results, errors = hammer(cache, 'q', compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), THREADS)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_exception_is_shared(self):
+        """Every waiter sees the leader's exception and nothing is cached."""
+        cache = QueryCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            raise RuntimeError("database is locked")
+
+        results, errors = hammer(cache, 'q', compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [])
+        self.assertEqual(len(errors), THREADS)
+        self.assertNotIn('q', cache)
+        self.assertEqual(cache.get_or_compute('q', lambda: 'ok'), 'ok')
+
+    def test_serve_stale_while_refreshing(self):
+        """Callers get the expired value while one refresh runs."""
+        cache = QueryCache(ttl=0.01)
+        cache.set('q', 'old')
+        time.sleep(0.02)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'new'
+
+        results, errors = hammer(cache, 'q', compute, serve_stale=True)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results.count('new'), 1)
+        self.assertEqual(results.count('old'), THREADS - 1)
+        self.assertEqual(cache.get('q'), 'new')
+
+    def test_commit_during_flight_is_not_cached(self):
+        """A result read before a commit is not stored after it."""
+        cache = QueryCache()
+
+        def compute():
+            notify_committed({'users'})
+            return 'stale'
+
+        self.assertEqual(cache.get_or_compute('q', compute, tables={'users'}), 'stale')
+        self.assertNotIn('q', cache)
+
+
+class TestTransactionalInvalidation(unittest.TestCase):
+    """Writes committed through the transactional decorator drop cached reads."""
+
+    @classmethod
+    def setUpClass(cls):
+        # importing the scripts runs their example queries, so give them a database
+        cls.workdir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.workdir.name, 'users.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT)")
+        conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, user_id INTEGER, total REAL)")
+        conn.execute("INSERT INTO users VALUES (1, 'Ada', 'ada@example.com')")
+        conn.commit()
+        conn.close()
+        cls.pool = db_connection.configure(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.transactional = staticmethod(__import__('2-transactional').transactional)
+            cls.cache_query = staticmethod(__import__('4-cache_query').cache_query)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.workdir.cleanup()
+
+    def fetch(self, query):
+        @db_connection.with_db_connection
+        @self.cache_query
+        def fetch(conn, query):
+            return conn.execute(query).fetchall()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fetch(query=query)
+
+    def add_order(self, total):
+        @db_connection.with_db_connection
+        @self.transactional
+        def add_order(conn, total):
+            conn.execute("INSERT INTO orders (user_id, total) VALUES (1, ?)", (total,))
+
+        add_order(total)
+
+    def test_insert_into_second_table_invalidates(self):
+        """An INSERT into the second table of a comma join is not served stale."""
+        query = "SELECT u.name, o.total FROM users u, orders o WHERE o.user_id = u.id"
+        before = self.fetch(query)
+        self.add_order(9.5)
+        self.assertEqual(self.fetch(query), before + [('Ada', 9.5)])
+
+    def test_insert_invalidates_subquery_read(self):
+        """A read the parser cannot account for is dropped by any commit."""
+        query = "SELECT name FROM users WHERE id IN (SELECT user_id FROM orders WHERE total > 100)"
+        self.assertEqual(self.fetch(query), [])
+        self.add_order(250.0)
+        self.assertEqual(self.fetch(query), [('Ada',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
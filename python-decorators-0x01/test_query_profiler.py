@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the query_profiler module.
+
+Covers query normalization, latency histograms, sampling and slow-query
+capture, then EXPLAIN of slow queries run through log_queries against a
+temporary SQLite database.
+"""
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from query_profiler import LatencyHistogram, QueryProfiler, count_rows, normalize
+
+
+class TestNormalize(unittest.TestCase):
+    """Literals collapse so one query shape gets one profile."""
+
+    def test_literals_and_in_lists(self):
+        """String and number literals and IN lists become placeholders."""
+        self.assertEqual(normalize("SELECT * FROM users WHERE age > 25 AND name = 'O''Neil'"),
+                         "SELECT * FROM users WHERE age > ? AND name = ?")
+        self.assertEqual(normalize("SELECT * FROM users WHERE id IN (1, 2,\n 3)"),
+                         "SELECT * FROM users WHERE id IN (?)")
+
+    def test_identifiers_with_digits_are_kept(self):
+        """Digits inside identifiers are not mistaken for literals."""
+        self.assertEqual(normalize("SELECT col1 FROM t2"), "SELECT col1 FROM t2")
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Percentiles come from power-of-two buckets."""
+
+    def test_percentiles(self):
+        """Percentiles fall in the right bucket and never exceed the max."""
+        histogram = LatencyHistogram()
+        for _ in range(99):
+            histogram.add(0.000010)
+        histogram.add(0.5)
+        self.assertEqual(histogram.count, 100)
+        self.assertLessEqual(histogram.percentile(0.5), 0.000016)
+        self.assertEqual(histogram.percentile(1.0), 0.5)
+
+
+class TestQueryProfiler(unittest.TestCase):
+    """Sampling, slow-query capture and top-N ordering."""
+
+    def test_sampling_off_and_on(self):
+        """Rate 0 never samples and rate 1 always does."""
+        self.assertFalse(QueryProfiler(sample_rate=0.0).sampled())
+        self.assertTrue(QueryProfiler(sample_rate=1.0).sampled())
+
+    def test_slow_queries_capture_plan(self):
+        """Only calls over the threshold run EXPLAIN and keep their caller."""
+        plans = []
+        profiler = QueryProfiler(sample_rate=1.0, slow_threshold=0.1,
+                                 explain=lambda query, params: plans.append(query) or 'PLAN')
+        profiler.record("SELECT * FROM users WHERE id = 1", 0.01, rows=1, caller='a')
+        profiler.record("SELECT * FROM users WHERE id = 2", 0.2, rows=1, caller='b')
+
+        [profile] = profiler.top()
+        self.assertEqual(profile['calls'], 2)
+        self.assertEqual(profile['rows'], 2)
+        self.assertEqual(plans, ["SELECT * FROM users WHERE id = 2"])
+        self.assertEqual(profile['slow'][0]['plan'], 'PLAN')
+        self.assertEqual(profile['slow'][0]['caller'], 'b')
+
+    def test_top_orders_by_total_time(self):
+        """top() ranks normalized queries by total time."""
+        profiler = QueryProfiler(sample_rate=1.0)
+        profiler.record("SELECT 1 FROM a", 0.01)
+        profiler.record("SELECT 1 FROM b", 0.03)
+        profiler.record("SELECT 1 FROM a", 0.01)
+        self.assertEqual([p['query'] for p in profiler.top(2)],
+                         ["SELECT ? FROM b", "SELECT ? FROM a"])
+
+    def test_count_rows(self):
+        """Row counts for None, a single row and a list of rows."""
+        self.assertEqual(count_rows(None), 0)
+        self.assertEqual(count_rows((1, 'a')), 1)
+        self.assertEqual(count_rows([(1,), (2,)]), 2)
+
+
+class TestLogQueries(unittest.TestCase):
+    """Slow queries logged by the decorator are explained with their params."""
+
+    @classmethod
+    def setUpClass(cls):
+        # importing the script queries users.db in the working directory
+        cls.workdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.workdir.name, 'users.db')
+        conn = sqlite3.connect(cls.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+        cwd = os.getcwd()
+        os.chdir(cls.workdir.name)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                cls.log_queries = staticmethod(__import__('0-log_queries').log_queries)
+        finally:
+            os.chdir(cwd)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.workdir.cleanup()
+
+    def plans(self, database, call):
+        profiler = QueryProfiler(sample_rate=1.0, slow_threshold=0.0)
+
+        @self.log_queries(profiler=profiler, database=database)
+        def fetch(query, params=()):
+            conn = sqlite3.connect(self.path)
+            try:
+                return conn.execute(query, params).fetchall()
+            finally:
+                conn.close()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            call(fetch)
+        return [slow['plan'] for profile in profiler.top() for slow in profile['slow']]
+
+    def test_positional_params_reach_explain(self):
+        """Params passed after a positional query are bound in EXPLAIN too."""
+        [plan] = self.plans(self.path, lambda fetch: fetch("SELECT * FROM users WHERE id = ?", (1,)))
+        self.assertIsInstance(plan, list)
+
+    def test_keyword_query_and_caller_connection(self):
+        """Keyword query and params are explained on the connection supplied."""
+        conn = sqlite3.connect(self.path)
+        try:
+            [plan] = self.plans(conn, lambda fetch: fetch(
+                query="SELECT * FROM users WHERE name = :name", params={'name': 'Ada'}))
+        finally:
+            conn.close()
+        self.assertIsInstance(plan, list)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the retry module and the retry_on_failure decorator.
+
+Covers the transient-error classifier, full-jitter backoff bounds, the
+overall deadline and the retry counters, then drives the sync and
+coroutine wrappers of retry_on_failure with stub functions.
+"""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import unittest
+
+import db_connection
+from retry import Deadline, RetryStats, full_jitter, is_transient
+
+LOCKED = sqlite3.OperationalError('database is locked')
+SYNTAX = sqlite3.OperationalError('near "SELEC": syntax error')
+
+
+class TestIsTransient(unittest.TestCase):
+    """Only lock and busy errors are worth retrying by default."""
+
+    def test_lock_errors_are_transient(self):
+        """'database is locked' and table locks are retried."""
+        self.assertTrue(is_transient(LOCKED))
+        self.assertTrue(is_transient(sqlite3.OperationalError('database table is locked: users')))
+
+    def test_other_errors_are_not(self):
+        """Syntax, integrity and non-sqlite errors are not retried."""
+        self.assertFalse(is_transient(SYNTAX))
+        self.assertFalse(is_transient(sqlite3.IntegrityError('UNIQUE constraint failed')))
+        self.assertFalse(is_transient(ValueError('database is locked')))
+
+
+class TestBackoff(unittest.TestCase):
+    """Delays grow exponentially, are capped and are never negative."""
+
+    def test_full_jitter_bounds(self):
+        """Every delay lies in [0, min(cap, base * 2**(attempt-1))]."""
+        rng = random.Random(0)
+        for attempt in range(1, 12):
+            window = min(5.0, 0.1 * 2 ** (attempt - 1))
+            for _ in range(200):
+                self.assertTrue(0 <= full_jitter(attempt, 0.1, 5.0, rng) <= window)
+
+    def test_deadline(self):
+        """An unlimited deadline has no remaining time; a set one counts down."""
+        self.assertIsNone(Deadline(None).remaining())
+        self.assertTrue(0 < Deadline(60).remaining() <= 60)
+        self.assertLessEqual(Deadline(0).remaining(), 0)
+
+
+class TestRetryStats(unittest.TestCase):
+    """Outcomes land in the right counters."""
+
+    def test_record(self):
+        """Attempts, retries and each kind of failure are counted."""
+        stats = RetryStats()
+        stats.record(1, 0.001, 'success')
+        stats.record(3, 0.2, 'exhausted')
+        stats.record(1, 0.001, 'not_retryable')
+        stats.record(2, 0.5, 'deadline')
+        snapshot = stats.snapshot()
+        self.assertEqual(snapshot['calls'], 4)
+        self.assertEqual(snapshot['attempts'], 7)
+        self.assertEqual(snapshot['retries'], 3)
+        self.assertEqual(snapshot['successes'], 1)
+        self.assertEqual(snapshot['failures'], 3)
+        self.assertEqual(snapshot['not_retryable'], 1)
+        self.assertEqual(snapshot['deadline_exceeded'], 1)
+        self.assertEqual(snapshot['max_seconds'], 0.5)
+
+
+def flaky(failures, error=LOCKED):
+    """Stub that raises ``error`` for its first ``failures`` calls."""
+    calls = []
+
+    def func():
+        calls.append(time.monotonic())
+        if len(calls) <= failures:
+            raise error
+        return 'ok'
+
+    return func, calls
+
+
+class TestRetryOnFailure(unittest.TestCase):
+    """The decorator around plain and coroutine functions."""
+
+    @classmethod
+    def setUpClass(cls):
+        # importing the script runs its example query, so give it a database
+        cls.workdir = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.workdir.name, 'users.db')
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT)")
+        conn.commit()
+        conn.close()
+        cls.pool = db_connection.configure(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cls.retry_on_failure = staticmethod(
+                __import__('3-retry_on_failure').retry_on_failure)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+        cls.workdir.cleanup()
+
+    def call(self, func, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args)
+
+    def test_transient_error_is_retried(self):
+        """Lock errors are retried until the call succeeds."""
+        stats = RetryStats()
+        func, calls = flaky(2)
+        wrapped = self.retry_on_failure(retries=5, delay=0.001, stats=stats)(func)
+        self.assertEqual(self.call(wrapped), 'ok')
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(stats.snapshot()['retries'], 2)
+
+    def test_non_transient_error_fails_first_attempt(self):
+        """A syntax error is raised at once without retrying."""
+        stats = RetryStats()
+        func, calls = flaky(5, SYNTAX)
+        wrapped = self.retry_on_failure(retries=5, delay=0.001, stats=stats)(func)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.call(wrapped)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(stats.snapshot()['not_retryable'], 1)
+
+    def test_retries_are_bounded(self):
+        """After ``retries`` attempts the last error is raised."""
+        func, calls = flaky(10)
+        wrapped = self.retry_on_failure(retries=3, delay=0.001, stats=RetryStats())(func)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.call(wrapped)
+        self.assertEqual(len(calls), 3)
+
+    def test_deadline_clamps_sleep(self):
+        """A backoff longer than the deadline is cut short, not given up on."""
+        stats = RetryStats()
+        func, calls = flaky(1)
+        wrapped = self.retry_on_failure(retries=5, delay=10, deadline=0.05, stats=stats)(func)
+        start = time.monotonic()
+        self.assertEqual(self.call(wrapped), 'ok')
+        self.assertEqual(len(calls), 2)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_deadline_stops_retrying(self):
+        """Once the deadline has passed the call gives up."""
+        stats = RetryStats()
+        func, calls = flaky(100)
+        wrapped = self.retry_on_failure(retries=100, delay=0.02, deadline=0.1, stats=stats)(func)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.call(wrapped)
+        self.assertLess(calls[-1] - calls[0], 0.5)
+        self.assertEqual(stats.snapshot()['deadline_exceeded'], 1)
+
+    def test_coroutine_retries_without_blocking_the_loop(self):
+        """The async wrapper retries with asyncio.sleep while other tasks run."""
+        stats = RetryStats()
+        func, calls = flaky(3)
+
+        async def coroutine():
+            return func()
+
+        wrapped = self.retry_on_failure(retries=5, delay=0.02, stats=stats)(coroutine)
+
+        async def run():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+
+            task = asyncio.ensure_future(ticker())
+            result = await wrapped()
+            task.cancel()
+            return result, ticks
+
+        result, ticks = self.call(asyncio.run, run())
+        self.assertEqual(result, 'ok')
+        self.assertEqual(len(calls), 4)
+        self.assertEqual(stats.snapshot()['successes'], 1)
+        # the ticker only runs if the backoff yielded to the loop
+        self.assertGreaterEqual(ticks, 1)
+
+    def test_coroutine_non_transient_error(self):
+        """The async wrapper raises non-transient errors at once too."""
+        func, calls = flaky(5, SYNTAX)
+
+        async def coroutine():
+            return func()
+
+        wrapped = self.retry_on_failure(retries=5, delay=0.001, stats=RetryStats())(coroutine)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.call(asyncio.run, wrapped())
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,55 @@
 #!/usr/bin/env python3
-from seed import connect_to_prodev
+from seed import acquire_connection, close_and_release, release_connection
+from query_spec import QuerySpec
+from user_row import row_factory
 
-def stream_users():
-    connection = connect_to_prodev()
+def stream_users(spec=None):
+    connection = acquire_connection()
     if not connection:
         return
 
-    cursor = connection.cursor(dictionary=True)
+    cursor = connection.cursor()
     try:
-        cursor.execute("SELECT user_id, name, email, age FROM user_data;")
+        cursor.execute(*(spec or QuerySpec()).compile())
+        make_row = row_factory(cursor.column_names)
         for row in cursor:
-            yield row
+            yield make_row(row)
     finally:
-        cursor.close()
-        connection.close()
+        close_and_release(connection, cursor)
+
+
+def stream_users_unbuffered(fetch_size=1000, spec=None):
+    """Stream rows off an unbuffered cursor, ``fetch_size`` rows at a time.
+
+    Only one fetch_size chunk is held client-side at any moment. If the
+    consumer stops early the socket is shut down instead of reading the
+    rest of the result set.
+    """
+    if fetch_size <= 0:
+        return
+
+    connection = acquire_connection()
+    if not connection:
+        return
+
+    cursor = connection.cursor(buffered=False)
+    exhausted = False
+    try:
+        cursor.execute(*(spec or QuerySpec()).compile())
+        make_row = row_factory(cursor.column_names)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                exhausted = True
+                break
+            for row in rows:
+                yield make_row(row)
+    finally:
+        if exhausted:
+            close_and_release(connection, cursor)
+        else:
+            # closing normally would drain the pending rows first
+            try:
+                connection.shutdown()
+            finally:
+                release_connection(connection, discard=True)
@@ -1,35 +1,338 @@
 #!/usr/bin/env python3
-from seed import connect_to_prodev
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from seed import acquire_connection, close_and_release
+from query_spec import QuerySpec
+from user_row import row_factory
 
-def stream_users_in_batches(batch_size):
+try:
+    import numpy as np
+except ImportError:  # only the columnar mode needs numpy
+    np = None
+
+def stream_users_in_batches(batch_size, spec=None, prefetch=0):
     if batch_size <= 0:
         return
 
-    conn = connect_to_prodev()
+    if prefetch > 0:
+        # fetch up to ``prefetch`` batches ahead while the caller works
+        yield from prefetched(stream_users_in_batches(batch_size, spec), prefetch)
+        return
+
+    conn = acquire_connection()
     if not conn:
         return
 
-    cursor = conn.cursor(dictionary=True)
+    cursor = conn.cursor()
     try:
-        cursor.execute("SELECT user_id, name, email, age FROM user_data;")
+        cursor.execute(*(spec or QuerySpec()).compile())
+        make_row = row_factory(cursor.column_names)
         while True:
             batch = cursor.fetchmany(batch_size)
             if not batch:
                 break
-            yield batch
+            yield [make_row(row) for row in batch]
     finally:
-        cursor.close()
-        conn.close()
+        close_and_release(conn, cursor)
 
 
-def batch_processing(batch_size):
-    for batch in stream_users_in_batches(batch_size):
-        for user in batch:
+class AdaptiveBatchSizer:
+    """Choose fetchmany sizes from observed fetch time and row size.
+
+    After each fetch the next size is the largest one expected to stay
+    within both ``target_seconds`` and ``target_bytes``, moving at most 2x
+    per step so one slow round trip does not collapse the batch size.
+    """
+
+    def __init__(self, target_seconds=0.05, target_bytes=1 << 20,
+                 initial=100, minimum=1, maximum=100000):
+        self.target_seconds = target_seconds
+        self.target_bytes = target_bytes
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = max(minimum, min(initial, maximum))
+        self.sizes = []
+        self.rows = 0
+        self.fetch_seconds = 0.0
+
+    def observe(self, rows, seconds, row_bytes):
+        """Record one fetch of ``rows`` rows averaging ``row_bytes`` each."""
+        self.sizes.append(self.size)
+        self.rows += rows
+        self.fetch_seconds += seconds
+        if not rows:
+            return
+
+        ideal = self.target_bytes / max(row_bytes, 1)
+        if seconds > 0:
+            ideal = min(ideal, self.target_seconds * rows / seconds)
+        ideal = max(self.size / 2, min(ideal, self.size * 2))
+        self.size = int(max(self.minimum, min(ideal, self.maximum)))
+
+    def stats(self):
+        return {
+            'batches': len(self.sizes),
+            'rows': self.rows,
+            'fetch_seconds': self.fetch_seconds,
+            'current_size': self.size,
+            'min_size': min(self.sizes, default=self.size),
+            'max_size': max(self.sizes, default=self.size),
+            'sizes': list(self.sizes),
+        }
+
+
+def _row_bytes(rows, sample=16):
+    # estimate from a few rows; sizing every value would cost more than the fetch
+    step = max(len(rows) // sample, 1)
+    picked = rows[::step]
+    total = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+                for row in picked)
+    return total / len(picked)
+
+
+def stream_users_adaptive(target_seconds=0.05, target_bytes=1 << 20, spec=None, sizer=None):
+    """Yield batches whose size adapts to a latency and a memory budget.
+
+    Pass your own AdaptiveBatchSizer as ``sizer`` to read the chosen sizes
+    through sizer.stats() afterwards.
+    """
+    sizer = sizer or AdaptiveBatchSizer(target_seconds, target_bytes)
+
+    conn = acquire_connection()
+    if not conn:
+        return
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*(spec or QuerySpec()).compile())
+        make_row = row_factory(cursor.column_names)
+        while True:
+            start = time.perf_counter()
+            rows = cursor.fetchmany(sizer.size)
+            elapsed = time.perf_counter() - start
+            if not rows:
+                break
+            sizer.observe(len(rows), elapsed, _row_bytes(rows))
+            yield [make_row(row) for row in rows]
+    finally:
+        close_and_release(conn, cursor)
+
+
+class _FetchError:
+    def __init__(self, error):
+        self.error = error
+
+
+_DONE = object()
+
+
+def prefetched(batches, depth):
+    """Iterate ``batches`` in a background thread, ``depth`` items ahead.
+
+    Errors raised by the producer are re-raised in the consumer. Closing the
+    returned generator early stops the producer and closes ``batches``.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
             try:
-                age_val = int(user.get('age', 0))
-            except Exception:
-                # skip rows with malformed age
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
                 continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as err:
+            put(_FetchError(err))
+        finally:
+            batches.close()
+
+    worker = threading.Thread(target=produce, name='batch-prefetch', daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _FetchError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+
+
+def _to_column(name, values):
+    if name == 'age':
+        return np.fromiter((int(v) for v in values), dtype=np.int32, count=len(values))
+    # fixed-width utf-8 bytes, sized to the longest value in this batch
+    return np.array([str(v).encode('utf-8') for v in values], dtype=np.bytes_)
+
+
+def stream_users_in_column_batches(batch_size, spec=None):
+    """Like stream_users_in_batches, but yield each batch as columns.
+
+    Every batch is a dict mapping column name to a NumPy array: ``age`` is
+    int32 and the string columns are fixed-width UTF-8 byte arrays.
+    """
+    if np is None:
+        raise ImportError("stream_users_in_column_batches requires numpy")
+    if batch_size <= 0:
+        return
+
+    conn = acquire_connection()
+    if not conn:
+        return
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*(spec or QuerySpec()).compile())
+        names = cursor.column_names
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield {name: _to_column(name, values)
+                   for name, values in zip(names, zip(*rows))}
+    finally:
+        close_and_release(conn, cursor)
+
+
+def filter_columns(columns, mask):
+    """Keep only the rows of a column batch where ``mask`` is true."""
+    return {name: values[mask] for name, values in columns.items()}
+
+
+def column_batch_processing(batch_size):
+    """Yield column batches holding only users older than 25."""
+    for columns in stream_users_in_column_batches(batch_size):
+        yield filter_columns(columns, columns['age'] > 25)
+
+
+OVER_25 = QuerySpec([('age', '>', 25)])
+
+
+def batch_processing(batch_size, workers=1):
+    if workers > 1:
+        for user in parallel_batch_processing(workers, batch_size=batch_size):
+            print(user)
+        return
+
+    # let MySQL filter on the age index instead of shipping every row
+    for batch in stream_users_in_batches(batch_size, OVER_25):
+        for user in batch:
+            print(user)
+
+
+def user_id_ranges(partitions):
+    """Split the user_id keyspace into ``partitions`` disjoint ranges.
+
+    user_id holds uuid4 strings, which are uniformly distributed over their
+    leading hex digits, so equal prefix ranges give equal-sized partitions.
+    Each range is (low, high) with low inclusive, high exclusive and None
+    meaning unbounded.
+    """
+    partitions = max(1, min(partitions, 0x10000))
+    bounds = [format(i * 0x10000 // partitions, '04x') for i in range(1, partitions)]
+    bounds = [None] + bounds + [None]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def scan_user_range(key_range, after=None, batch_size=1000):
+    """Return up to ``batch_size`` rows with age > 25 from ``key_range``.
+
+    Rows come in user_id order starting after the ``after`` key (or at
+    the start of the range), so calling again with the last user_id
+    returned pages through the range.
+    """
+    low, high = key_range
+    filters = list(OVER_25.filters)
+    if after is not None:
+        filters.append(('user_id', '>', after))
+    elif low is not None:
+        filters.append(('user_id', '>=', low))
+    if high is not None:
+        filters.append(('user_id', '<', high))
+    spec = QuerySpec(filters, order_by='user_id', limit=batch_size)
+
+    conn = acquire_connection()
+    if not conn:
+        raise RuntimeError("could not connect to ALX_prodev")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute(*spec.compile())
+        make_row = row_factory(cursor.column_names)
+        return [make_row(row) for row in cursor.fetchall()]
+    finally:
+        close_and_release(conn, cursor)
+
+
+def _scan_page(task):
+    return scan_user_range(*task)
+
+
+def parallel_batch_processing(workers=None, partitions=None, ordered=False, batch_size=1000):
+    """Yield rows with age > 25, scanning key ranges in worker processes.
+
+    Each worker process keeps its own connection and fetches one page of
+    at most ``batch_size`` rows per task, so memory stays around
+    ``(workers + 1) * batch_size`` rows whatever the table size. Up to
+    ``workers`` ranges are scanned at once. With ``ordered`` the rows come
+    back in user_id order: only the earliest unfinished range keeps
+    paging, while the others wait with one page fetched ahead.
+    """
+    workers = workers or os.cpu_count() or 1
+    # more ranges than workers keeps every core busy when ranges are uneven
+    ranges = user_id_ranges(partitions or workers * 4)
+    pages = queue.Queue()
+
+    with multiprocessing.Pool(workers) as pool:
+        def request(index, after=None):
+            pool.apply_async(_scan_page, ((ranges[index], after, batch_size),),
+                             callback=lambda rows: pages.put((index, rows, None)),
+                             error_callback=lambda err: pages.put((index, None, err)))
+
+        started = active = head = 0
+        while started < len(ranges) and active < workers:
+            request(started)
+            started += 1
+            active += 1
 
-            if age_val > 25:
-                print(user)
+        parked = {}
+        while active:
+            index, rows, err = pages.get()
+            if err is not None:
+                raise err
+            parked[index] = rows
+            while True:
+                key = head if ordered else index
+                if key not in parked:
+                    break
+                rows = parked.pop(key)
+                yield from rows
+                if len(rows) == batch_size:
+                    # the range may have more rows: fetch its next page
+                    request(key, rows[-1]['user_id'])
+                    break
+                active -= 1
+                if started < len(ranges):
+                    request(started)
+                    started += 1
+                    active += 1
+                if not ordered:
+                    break
+                head += 1
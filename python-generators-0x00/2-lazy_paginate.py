@@ -1,19 +1,21 @@
 #!/usr/bin/env python3
+import base64
 import seed
+from user_row import row_factory
 
 
 def paginate_users(page_size, offset):
-    connection = seed.connect_to_prodev()
+    connection = seed.acquire_connection()
     if not connection:
         return []
-    cursor = connection.cursor(dictionary=True)
+    cursor = connection.cursor()
     try:
         cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
-        rows = cursor.fetchall()
+        make_row = row_factory(cursor.column_names)
+        rows = [make_row(row) for row in cursor.fetchall()]
         return rows
     finally:
-        cursor.close()
-        connection.close()
+        seed.close_and_release(connection, cursor)
 
 
 def lazy_pagination(page_size):
@@ -28,3 +30,66 @@ def lazy_pagination(page_size):
 
 # compatibility: allow either name
 lazy_paginate = lazy_pagination
+
+
+def encode_cursor(user_id):
+    """Turn the last user_id of a page into an opaque resume token."""
+    return base64.urlsafe_b64encode(str(user_id).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token):
+    """Inverse of encode_cursor; None/empty means start from the beginning."""
+    if not token:
+        return None
+    try:
+        return base64.urlsafe_b64decode(token.encode('ascii')).decode('utf-8')
+    except (ValueError, UnicodeError):
+        raise ValueError(f"Invalid pagination cursor: {token!r}")
+
+
+def paginate_users_keyset(connection, page_size, after=None):
+    """Fetch one page of rows whose user_id sorts after ``after``.
+
+    Seeks on the primary key, so the cost of a page does not depend on how
+    deep into the table it is.
+    """
+    cursor = connection.cursor()
+    try:
+        if after is None:
+            cursor.execute(
+                "SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+        else:
+            cursor.execute(
+                "SELECT * FROM user_data WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (after, page_size))
+        make_row = row_factory(cursor.column_names)
+        return [make_row(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def lazy_pagination_keyset(page_size, cursor=None):
+    """Yield pages in user_id order over a single connection.
+
+    ``cursor`` is a token from encode_cursor(); pass the token of the last
+    row you saw to resume right after it.
+    """
+    if page_size <= 0:
+        return
+
+    connection = seed.acquire_connection()
+    if not connection:
+        return
+
+    after = decode_cursor(cursor)
+    try:
+        while True:
+            rows = paginate_users_keyset(connection, page_size, after)
+            if not rows:
+                break
+            yield rows
+            if len(rows) < page_size:
+                break
+            after = rows[-1]['user_id']
+    finally:
+        seed.release_connection(connection)
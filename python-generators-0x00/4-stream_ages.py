@@ -1,36 +1,51 @@
 #!/usr/bin/env python3
-from seed import connect_to_prodev
+from seed import acquire_connection, close_and_release
+from query_spec import QuerySpec
+from aggregates import pushdown_age_stats
 
 
-def stream_user_ages():
-    conn = connect_to_prodev()
+def stream_user_ages(batch_size=1000):
+    conn = acquire_connection()
     if not conn:
         return
 
     cursor = conn.cursor()
     try:
-        cursor.execute("SELECT age FROM user_data;")
+        cursor.execute(*QuerySpec(columns=['age']).compile())
         while True:
-            row = cursor.fetchone()
-            if row is None:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
                 break
-            # row[0] should be the age (DECIMAL stored); convert to int
-            try:
-                yield int(row[0])
-            except Exception:
-                # skip malformed values
-                continue
+            for row in rows:
+                # row[0] should be the age (DECIMAL stored); convert to int
+                try:
+                    yield int(row[0])
+                except Exception:
+                    # skip malformed values
+                    continue
     finally:
-        cursor.close()
-        conn.close()
+        close_and_release(conn, cursor)
 
 
-def calculate_average_age():
+def calculate_average_age(columnar=False, batch_size=1000, pushdown=False):
     total = 0
     count = 0
-    for age in stream_user_ages():
-        total += age
-        count += 1
+    if pushdown:
+        # nothing is transformed in Python, so let the database aggregate
+        stats = pushdown_age_stats(histogram=False)
+        total, count = stats.total, stats.count
+    elif columnar:
+        # sum each batch as an array instead of one Python int at a time
+        batching = __import__('1-batch_processing')
+        spec = QuerySpec(columns=['age'])
+        for columns in batching.stream_users_in_column_batches(batch_size, spec):
+            ages = columns['age']
+            total += int(ages.sum(dtype='int64'))
+            count += ages.size
+    else:
+        for age in stream_user_ages(batch_size):
+            total += age
+            count += 1
 
     average = 0.0
     if count:
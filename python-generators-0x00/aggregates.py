@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""One-pass, mergeable aggregates over user ages.
+
+AgeStats keeps count, sum, sum of squares, min, max and an exact histogram.
+Ages are integers, so every field is exact and two partial states combine
+with merge(), whether they come from key-range partitions, worker
+processes or a query pushed down to the database.
+"""
+import multiprocessing
+import os
+from collections import Counter
+
+import seed
+from query_spec import QuerySpec
+
+
+class AgeStats:
+    """Running aggregate of integer ages."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_squares = 0
+        self.minimum = None
+        self.maximum = None
+        self.histogram = Counter()
+
+    def update(self, age):
+        age = int(age)
+        self.count += 1
+        self.total += age
+        self.total_squares += age * age
+        if self.minimum is None or age < self.minimum:
+            self.minimum = age
+        if self.maximum is None or age > self.maximum:
+            self.maximum = age
+        self.histogram[age] += 1
+        return self
+
+    def update_many(self, ages):
+        for age in ages:
+            self.update(age)
+        return self
+
+    def merge(self, other):
+        """Fold another partial state into this one."""
+        self.count += other.count
+        self.total += other.total
+        self.total_squares += other.total_squares
+        for value in (other.minimum, other.maximum):
+            if value is None:
+                continue
+            if self.minimum is None or value < self.minimum:
+                self.minimum = value
+            if self.maximum is None or value > self.maximum:
+                self.maximum = value
+        self.histogram.update(other.histogram)
+        return self
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def variance(self):
+        """Population variance."""
+        if not self.count:
+            return 0.0
+        # integer arithmetic up to the final division keeps this exact
+        return (self.count * self.total_squares - self.total ** 2) / self.count ** 2
+
+    def result(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'min': self.minimum,
+            'max': self.maximum,
+            'mean': self.mean,
+            'variance': self.variance,
+            'histogram': dict(sorted(self.histogram.items())),
+        }
+
+
+def age_stats(ages):
+    """Aggregate any iterable of ages, e.g. stream_user_ages()."""
+    return AgeStats().update_many(ages)
+
+
+def pushdown_age_stats(spec=None, histogram=True):
+    """Compute AgeStats inside the database instead of streaming rows.
+
+    ``spec`` may restrict the rows with filters; its columns are ignored.
+    """
+    where, params = (spec or QuerySpec()).where_clause()
+
+    stats = AgeStats()
+    with seed.pooled_connection() as connection:
+        if not connection:
+            raise RuntimeError("could not connect to ALX_prodev")
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT COUNT(age), SUM(age), SUM(age * age), MIN(age), MAX(age) "
+                f"FROM user_data{where}", params)
+            count, total, squares, minimum, maximum = cursor.fetchone()
+            stats.count = int(count or 0)
+            stats.total = int(total or 0)
+            stats.total_squares = int(squares or 0)
+            stats.minimum = None if minimum is None else int(minimum)
+            stats.maximum = None if maximum is None else int(maximum)
+
+            if histogram:
+                cursor.execute(
+                    f"SELECT age, COUNT(*) FROM user_data{where} GROUP BY age", params)
+                stats.histogram = Counter({int(age): int(n) for age, n in cursor.fetchall()})
+        finally:
+            cursor.close()
+    return stats
+
+
+def range_age_stats(key_range):
+    """AgeStats for the users whose user_id falls in ``key_range``."""
+    low, high = key_range
+    filters = []
+    if low is not None:
+        filters.append(('user_id', '>=', low))
+    if high is not None:
+        filters.append(('user_id', '<', high))
+
+    stats = AgeStats()
+    with seed.pooled_connection() as connection:
+        if not connection:
+            raise RuntimeError("could not connect to ALX_prodev")
+        cursor = connection.cursor()
+        try:
+            cursor.execute(*QuerySpec(filters, columns=['age']).compile())
+            while True:
+                rows = cursor.fetchmany(5000)
+                if not rows:
+                    break
+                stats.update_many(row[0] for row in rows)
+        finally:
+            cursor.close()
+    return stats
+
+
+def parallel_age_stats(workers=None, partitions=None):
+    """Aggregate ages over key-range partitions in worker processes."""
+    batching = __import__('1-batch_processing')
+    workers = workers or os.cpu_count() or 1
+    ranges = batching.user_id_ranges(partitions or workers * 4)
+
+    stats = AgeStats()
+    with multiprocessing.Pool(workers) as pool:
+        for partial in pool.imap_unordered(range_age_stats, ranges):
+            stats.merge(partial)
+    return stats
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Storage backends behind seed.py.
+
+MySQLBackend is the original mysql-connector setup. SQLiteBackend runs the
+same schema in an embedded SQLite file, wrapping its connections so the
+generators can keep using the mysql-connector calls they already make
+(``%s`` placeholders, ``cursor(buffered=False)``, ``column_names``, ...).
+"""
+import os
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Any
+
+try:
+    import mysql.connector
+except ImportError:  # the SQLite backend works without mysql-connector
+    mysql = None
+
+# a mysql-connector connection or a SQLiteConnection
+Connection = Any
+
+
+class MySQLBackend:
+    """ALX_prodev on a MySQL server configured through MYSQL_* env vars."""
+
+    name = 'mysql'
+
+    def __init__(self):
+        if mysql is None:
+            raise ImportError("the mysql backend requires mysql-connector-python")
+        self.Error = mysql.connector.Error
+
+    def _settings(self):
+        return {
+            'host': os.getenv("MYSQL_HOST", "localhost"),
+            'port': int(os.getenv("MYSQL_PORT", 3306)),
+            'user': os.getenv("MYSQL_USER", "root"),
+            'password': os.getenv("MYSQL_PASSWORD", ""),
+        }
+
+    def connect_server(self):
+        try:
+            return mysql.connector.connect(**self._settings())
+        except mysql.connector.Error as err:
+            print(f"Error connecting to MySQL server: {err}")
+            return None
+
+    def connect(self):
+        try:
+            return mysql.connector.connect(database="ALX_prodev", **self._settings())
+        except mysql.connector.Error as err:
+            print(f"Error connecting to ALX_prodev database: {err}")
+            return None
+
+    def create_database(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;")
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def database_exists(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_NAME = 'ALX_prodev';")
+            return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+
+    def create_table(self, connection):
+        create_table_query = (
+            "CREATE TABLE IF NOT EXISTS user_data ("
+            "user_id VARCHAR(36) NOT NULL PRIMARY KEY,"
+            "name VARCHAR(255) NOT NULL,"
+            "email VARCHAR(255) NOT NULL,"
+            "age DECIMAL(5,0) NOT NULL,"
+            "UNIQUE KEY email_unique (email),"
+            "KEY age_idx (age)"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
+        )
+
+        cursor = connection.cursor()
+        try:
+            cursor.execute(create_table_query)
+            # tables created before age_idx existed need it added separately
+            cursor.execute(
+                "SELECT 1 FROM INFORMATION_SCHEMA.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data' "
+                "AND INDEX_NAME = 'age_idx' LIMIT 1"
+            )
+            if not cursor.fetchone():
+                cursor.execute("CREATE INDEX age_idx ON user_data (age)")
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def ping(self, connection):
+        return connection.is_connected()
+
+
+# %s placeholders outside quotes; quoted strings and identifiers match whole
+_PLACEHOLDER = re.compile(r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`[^`]*`|(%s)""")
+
+
+@lru_cache(maxsize=256)
+def _translate(sql):
+    """Rewrite the MySQL dialect used in this project for SQLite.
+
+    Only ``%s`` placeholders outside string literals and quoted
+    identifiers become ``?``, so ``LIKE '%smith'`` is left alone.
+    """
+    sql = _PLACEHOLDER.sub(lambda m: '?' if m.group(1) else m.group(0), sql)
+    sql = re.sub(r'^\s*INSERT\s+IGNORE\b', 'INSERT OR IGNORE', sql, flags=re.IGNORECASE)
+    return sql
+
+
+class SQLiteCursor:
+    """mysql-connector style cursor over a sqlite3 cursor."""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def column_names(self):
+        description = self._cursor.description or ()
+        return tuple(column[0] for column in description)
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(_translate(sql), tuple(params or ()))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(_translate(sql), seq_of_params)
+        return self
+
+    def _convert(self, rows):
+        if not self._dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchmany(self, size=1):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def __iter__(self):
+        if not self._dictionary:
+            return iter(self._cursor)
+        names = self.column_names
+        return (dict(zip(names, row)) for row in self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """mysql-connector style connection over a sqlite3 connection."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, dictionary=False, buffered=None):
+        # sqlite3 cursors always step through results lazily
+        return SQLiteCursor(self._connection.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def is_connected(self):
+        try:
+            self._connection.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._connection.close()
+
+    # an embedded database has no result stream to abandon
+    shutdown = close
+
+
+class SQLiteBackend:
+    """ALX_prodev in an embedded SQLite file tuned for bulk work.
+
+    Connections use WAL journaling, synchronous=NORMAL, a large page cache
+    and memory-mapped reads. bulk_insert_data and resumable_seed commit
+    after every chunk, so each chunk is one transaction.
+    """
+
+    name = 'sqlite'
+    Error = sqlite3.Error
+
+    def __init__(self, path=None, cache_kib=65536, mmap_bytes=256 * 1024 * 1024):
+        self.path = path or os.getenv("SQLITE_PATH", "ALX_prodev.db")
+        self.cache_kib = cache_kib
+        self.mmap_bytes = mmap_bytes
+
+    def connect(self):
+        try:
+            # the pool may hand a connection to a different thread
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(self.cache_kib)}")
+            conn.execute(f"PRAGMA mmap_size={int(self.mmap_bytes)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            return SQLiteConnection(conn)
+        except sqlite3.Error as err:
+            print(f"Error opening SQLite database {self.path}: {err}")
+            return None
+
+    # the file is the database, so there is no separate server connection
+    connect_server = connect
+
+    def create_database(self, connection):
+        pass
+
+    def database_exists(self, connection):
+        return os.path.exists(self.path)
+
+    def create_table(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS user_data ("
+                "user_id TEXT NOT NULL PRIMARY KEY,"
+                "name TEXT NOT NULL,"
+                "email TEXT NOT NULL COLLATE NOCASE,"
+                "age NUMERIC NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS email_unique ON user_data (email)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS age_idx ON user_data (age)")
+            connection.commit()
+        finally:
+            cursor.close()
+
+    def ping(self, connection):
+        return connection.is_connected()
+
+
+BACKENDS = {
+    'mysql': MySQLBackend,
+    'sqlite': SQLiteBackend,
+}
+
+
+def make_backend(name=None):
+    """Build the backend named by ``name`` or the PRODEV_BACKEND env var."""
+    name = (name or os.getenv("PRODEV_BACKEND", "mysql")).lower()
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown backend {name!r}; expected one of {sorted(BACKENDS)}") from None
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Compare dict batches with NumPy column batches.
+
+Reports rows/s for a full scan that sums ages, and the bytes held per row
+by one batch in each representation.
+
+Usage: ./bench_columnar.py [batch_size]
+"""
+import sys
+import time
+import tracemalloc
+
+batching = __import__('1-batch_processing')
+
+
+def scan_dicts(batch_size):
+    rows = total = 0
+    for batch in batching.stream_users_in_batches(batch_size):
+        total += sum(int(user['age']) for user in batch)
+        rows += len(batch)
+    return rows
+
+
+def scan_columns(batch_size):
+    rows = total = 0
+    for columns in batching.stream_users_in_column_batches(batch_size):
+        total += int(columns['age'].sum(dtype='int64'))
+        rows += columns['age'].size
+    return rows
+
+
+def dict_batch_bytes(batch_size):
+    tracemalloc.start()
+    batch = next(batching.stream_users_in_batches(batch_size), [])
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / max(len(batch), 1)
+
+
+def column_batch_bytes(batch_size):
+    columns = next(batching.stream_users_in_column_batches(batch_size), {})
+    rows = columns['age'].size if columns else 0
+    return sum(values.nbytes for values in columns.values()) / max(rows, 1)
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    print(f"{'mode':>8} {'rows':>10} {'rows/s':>12} {'bytes/row':>10}")
+    for mode, scan, measure in (('dict', scan_dicts, dict_batch_bytes),
+                                ('columns', scan_columns, column_batch_bytes)):
+        start = time.perf_counter()
+        rows = scan(batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{mode:>8} {rows:>10} {rows / elapsed:>12.0f} {measure(batch_size):>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
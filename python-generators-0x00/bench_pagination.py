@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Compare late-page latency of OFFSET and keyset pagination.
+
+Usage: ./bench_pagination.py [page_size] [pages_to_sample]
+"""
+import sys
+import time
+
+import seed
+
+lazy = __import__('2-lazy_paginate')
+
+
+def time_call(func, *args):
+    start = time.perf_counter()
+    rows = func(*args)
+    return time.perf_counter() - start, rows
+
+
+def main():
+    page_size = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    connection = seed.connect_to_prodev()
+    if not connection:
+        raise SystemExit(1)
+
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    total = cursor.fetchone()[0]
+    cursor.close()
+    pages = max(total // page_size, 1)
+    step = max(pages // samples, 1)
+
+    print(f"{total} rows, page_size={page_size}")
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    try:
+        for page in range(0, pages, step):
+            offset_time, rows = time_call(lazy.paginate_users, page_size, page * page_size)
+            after = None
+            if page:
+                # the keyset query needs the key that ended the previous page
+                cursor = connection.cursor()
+                cursor.execute("SELECT user_id FROM user_data ORDER BY user_id LIMIT 1 OFFSET %s",
+                               (page * page_size - 1,))
+                after = cursor.fetchone()[0]
+                cursor.close()
+            keyset_time, _ = time_call(lazy.paginate_users_keyset, connection, page_size, after)
+            print(f"{page:>8} {offset_time * 1000:>10.2f} {keyset_time * 1000:>10.2f}")
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
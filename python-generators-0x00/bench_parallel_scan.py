@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""Time the age > 25 scan serially and with 1..N worker processes.
+
+Usage: ./bench_parallel_scan.py [max_workers] [batch_size]
+"""
+import os
+import sys
+import time
+
+batching = __import__('1-batch_processing')
+
+
+def serial_scan(batch_size):
+    count = 0
+    for batch in batching.stream_users_in_batches(batch_size, batching.OVER_25):
+        count += len(batch)
+    return count
+
+
+def parallel_scan(workers, batch_size):
+    return sum(1 for _ in batching.parallel_batch_processing(workers, batch_size=batch_size))
+
+
+def main():
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else (os.cpu_count() or 1)
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    start = time.perf_counter()
+    count = serial_scan(batch_size)
+    base = time.perf_counter() - start
+    print(f"{'mode':>12} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+    print(f"{'serial':>12} {count:>10} {base:>9.3f} {count / base:>12.0f} {1.0:>8.2f}")
+
+    workers = 1
+    while workers <= max_workers:
+        start = time.perf_counter()
+        count = parallel_scan(workers, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f"{f'{workers} workers':>12} {count:>10} {elapsed:>9.3f} "
+              f"{count / elapsed:>12.0f} {base / elapsed:>8.2f}")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Micro-benchmark dict rows against UserRow.
+
+Builds rows from synthetic cursor tuples, so no database is needed.
+
+Usage: ./bench_rows.py [rows]
+"""
+import sys
+import time
+import tracemalloc
+import uuid
+from decimal import Decimal
+
+from query_spec import USER_COLUMNS
+from user_row import row_factory
+
+
+def make_tuples(count):
+    return [(str(uuid.uuid4()), f"User {i}", f"user{i}@example.com", Decimal(i % 100))
+            for i in range(count)]
+
+
+def as_dicts(tuples):
+    return [dict(zip(USER_COLUMNS, row)) for row in tuples]
+
+
+def as_user_rows(tuples):
+    make_row = row_factory(USER_COLUMNS)
+    return [make_row(row) for row in tuples]
+
+
+def measure(build, tuples):
+    tracemalloc.start()
+    rows = build(tuples)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del rows
+
+    start = time.perf_counter()
+    rows = build(tuples)
+    total = sum(int(row.get('age')) for row in rows)
+    elapsed = time.perf_counter() - start
+    return size / len(tuples), len(tuples) / elapsed, total
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    tuples = make_tuples(count)
+
+    print(f"{'row type':>10} {'bytes/row':>10} {'rows/s':>12}")
+    for name, build in (('dict', as_dicts), ('UserRow', as_user_rows)):
+        per_row, rate, _ = measure(build, tuples)
+        print(f"{name:>10} {per_row:>10.1f} {rate:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
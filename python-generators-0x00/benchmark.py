@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""Synthetic-data benchmark suite for the user generators.
+
+Generates a synthetic user CSV, seeds it into an embedded SQLite database
+(no database service needed) and measures the seeding path and each
+generator. Every case runs in a fresh process so peak RSS is its own.
+Results are printed as JSON lines and optionally written to a JSON file
+that can be diffed between commits.
+
+Usage: ./benchmark.py [--rows 10000 1000000 ...] [--output results.json]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import seed
+from backends import SQLiteBackend
+
+FIRST = ['Ada', 'Grace', 'Alan', 'Edsger', 'Barbara', 'Donald', 'Ken', 'Frances']
+LAST = ['Lovelace', 'Hopper', 'Turing', 'Dijkstra', 'Liskov', 'Knuth', 'Thompson', 'Allen']
+DOMAINS = ['gmail.com', 'yahoo.com', 'hotmail.com', 'example.org']
+
+
+def generate_csv(path, rows, seed_value=0):
+    """Write ``rows`` synthetic users in the user_data.csv format."""
+    rng = random.Random(seed_value)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('"name","email","age"\n')
+        for i in range(rows):
+            name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+            email = f"user{i}@{rng.choice(DOMAINS)}"
+            f.write(f'"{name}","{email}","{rng.randint(1, 120)}"\n')
+
+
+def _peak_rss_kib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _consume(iterable, per_item=lambda item: 1):
+    start = time.perf_counter()
+    first = None
+    rows = 0
+    for item in iterable:
+        if first is None:
+            first = time.perf_counter() - start
+        rows += per_item(item)
+    return rows, first, time.perf_counter() - start
+
+
+def _case_seed(csv_path):
+    connection = seed.connect_to_prodev()
+    seed.create_table(connection)
+    start = time.perf_counter()
+    stats = seed.bulk_insert_data(connection, csv_path)
+    elapsed = time.perf_counter() - start
+    connection.close()
+    return stats['rows'], None, elapsed
+
+
+def _case_stream_users(csv_path):
+    return _consume(__import__('0-stream_users').stream_users())
+
+
+def _case_stream_users_in_batches(csv_path):
+    batching = __import__('1-batch_processing')
+    return _consume(batching.stream_users_in_batches(1000), len)
+
+
+def _case_lazy_pagination(csv_path):
+    return _consume(__import__('2-lazy_paginate').lazy_pagination(1000), len)
+
+
+def _case_lazy_pagination_keyset(csv_path):
+    return _consume(__import__('2-lazy_paginate').lazy_pagination_keyset(1000), len)
+
+
+def _case_stream_user_ages(csv_path):
+    return _consume(__import__('4-stream_ages').stream_user_ages())
+
+
+CASES = {
+    'seed': _case_seed,
+    'stream_users': _case_stream_users,
+    'stream_users_in_batches': _case_stream_users_in_batches,
+    'lazy_pagination': _case_lazy_pagination,
+    'lazy_pagination_keyset': _case_lazy_pagination_keyset,
+    'stream_user_ages': _case_stream_user_ages,
+}
+
+
+def _run_case(name, csv_path, db_path, results):
+    seed.use_backend(SQLiteBackend(db_path))
+    try:
+        # keep stdout for the JSON result lines
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            rows, first, elapsed = CASES[name](csv_path)
+    except Exception as e:
+        results.put({'case': name, 'error': f"{type(e).__name__}: {e}"})
+        return
+    result = {
+        'case': name,
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+        'time_to_first_row': first,
+        'peak_rss_kib': _peak_rss_kib(),
+    }
+    if not rows:
+        # a failed connection ends the generators quietly with nothing read
+        result['error'] = "no rows processed"
+    results.put(result)
+
+
+def run_case(name, csv_path, db_path, timeout=None):
+    """Run one case in a fresh process and return its measurements.
+
+    A case that fails, dies or runs past ``timeout`` seconds returns a
+    dict with an 'error' key instead of hanging the suite.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_run_case, args=(name, csv_path, db_path, results))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=1.0)
+        except queue.Empty:
+            if not process.is_alive():
+                result = {'case': name, 'error': f"process exited with code {process.exitcode}"}
+            elif deadline is not None and time.monotonic() > deadline:
+                process.terminate()
+                result = {'case': name, 'error': f"timed out after {timeout} seconds"}
+    process.join()
+    return result
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes, cases, workdir, max_offset_rows, timeout=None):
+    results = []
+    for size in sizes:
+        csv_path = os.path.join(workdir, f"users_{size}.csv")
+        db_path = os.path.join(workdir, f"users_{size}.db")
+        generate_csv(csv_path, size)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        for name in cases:
+            if name == 'lazy_pagination' and size > max_offset_rows:
+                # OFFSET paging is quadratic; at 10M rows it would run for hours
+                continue
+            result = dict(run_case(name, csv_path, db_path, timeout), size=size)
+            print(json.dumps(result), flush=True)
+            results.append(result)
+            if name == 'seed' and 'error' in result:
+                # nothing to read without a seeded database
+                break
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000, 10000000])
+    parser.add_argument('--cases', nargs='+', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--output', help='write all results to this JSON file')
+    parser.add_argument('--workdir', help='keep generated CSVs and databases here')
+    parser.add_argument('--max-offset-rows', type=int, default=1000000,
+                        help='skip OFFSET lazy_pagination above this many rows')
+    parser.add_argument('--timeout', type=float, help='fail a case after this many seconds')
+    args = parser.parse_args()
+
+    if 'seed' not in args.cases:
+        # the read cases need a seeded database
+        args.cases.insert(0, 'seed')
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        results = run_suite(args.rows, args.cases, args.workdir, args.max_offset_rows,
+                            args.timeout)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run_suite(args.rows, args.cases, workdir, args.max_offset_rows,
+                                args.timeout)
+
+    if args.output:
+        report = {
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    failed = [result for result in results if 'error' in result]
+    if failed:
+        sys.exit(f"{len(failed)} benchmark case(s) failed")
+
+
+if __name__ == '__main__':
+    main()
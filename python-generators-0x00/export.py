@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""Export user_data to a compressed columnar file and read it back.
+
+The file holds row groups of up to ``row_group_size`` rows. Inside a row
+group each column is stored separately and zlib-compressed: age as int32,
+strings as a uint32 length array followed by their UTF-8 bytes. A JSON
+footer records where every column chunk lives together with its min, max
+and row count, so readers can skip row groups without decompressing them.
+
+    magic | column chunks ... | footer JSON | footer length (8 bytes) | magic
+
+Usage: ./export.py users.ucol [--row-group-size N]
+"""
+import argparse
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+
+from user_row import row_factory
+
+MAGIC = b'UCOL1\n'
+FORMAT_VERSION = 1
+
+
+def _encode_column(name, values):
+    if name == 'age':
+        data = array('i', (int(v) for v in values))
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return data.tobytes()
+    encoded = [str(v).encode('utf-8') for v in values]
+    lengths = array('I', map(len, encoded))
+    if sys.byteorder != 'little':
+        lengths.byteswap()
+    return lengths.tobytes() + b''.join(encoded)
+
+
+def _decode_column(name, payload, rows):
+    if name == 'age':
+        data = array('i')
+        data.frombytes(payload)
+        if sys.byteorder != 'little':
+            data.byteswap()
+        return data.tolist()
+    lengths = array('I')
+    lengths.frombytes(payload[:4 * rows])
+    if sys.byteorder != 'little':
+        lengths.byteswap()
+    values = []
+    position = 4 * rows
+    for length in lengths:
+        values.append(payload[position:position + length].decode('utf-8'))
+        position += length
+    return values
+
+
+def _column_stats(name, values):
+    if name == 'age':
+        values = [int(v) for v in values]
+    return {'min': min(values), 'max': max(values)}
+
+
+def write_columnar(path, batches, compression_level=6):
+    """Write an iterable of row batches (lists of UserRow/dicts) to ``path``.
+
+    Returns the number of rows written. Only one batch is held in memory.
+    """
+    groups = []
+    columns = None
+    total = 0
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        for batch in batches:
+            if not batch:
+                continue
+            if columns is None:
+                columns = list(batch[0].keys())
+            group = {'rows': len(batch), 'columns': {}}
+            for name in columns:
+                values = [row[name] for row in batch]
+                chunk = zlib.compress(_encode_column(name, values), compression_level)
+                group['columns'][name] = dict(
+                    _column_stats(name, values), offset=f.tell(), length=len(chunk))
+                f.write(chunk)
+            groups.append(group)
+            total += len(batch)
+
+        footer = json.dumps({
+            'version': FORMAT_VERSION,
+            'columns': columns or [],
+            'rows': total,
+            'row_groups': groups,
+        }).encode('utf-8')
+        f.write(footer)
+        f.write(struct.pack('<Q', len(footer)))
+        f.write(MAGIC)
+    return total
+
+
+def read_footer(path):
+    """Return the footer: column names, row count and row-group stats."""
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _footer(mm)
+
+
+def _footer(mm):
+    tail = len(MAGIC) + 8
+    if mm[:len(MAGIC)] != MAGIC or mm[-len(MAGIC):] != MAGIC:
+        raise ValueError("not a columnar user export")
+    (length,) = struct.unpack('<Q', mm[-tail:-len(MAGIC)])
+    return json.loads(mm[-tail - length:-tail].decode('utf-8'))
+
+
+def iter_row_groups(path, columns=None, group_filter=None):
+    """Yield each row group as a dict of column name to list of values.
+
+    ``group_filter(stats)`` receives a row group's footer entry and may
+    return False to skip it without decompressing anything.
+    """
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        footer = _footer(mm)
+        names = columns or footer['columns']
+        for group in footer['row_groups']:
+            if group_filter and not group_filter(group):
+                continue
+            decoded = {}
+            for name in names:
+                chunk = group['columns'][name]
+                payload = zlib.decompress(mm[chunk['offset']:chunk['offset'] + chunk['length']])
+                decoded[name] = _decode_column(name, payload, group['rows'])
+            yield decoded
+
+
+def read_users(path, columns=None, group_filter=None):
+    """Generator of UserRow objects, the same shape stream_users() yields."""
+    for group in iter_row_groups(path, columns, group_filter):
+        names = list(group)
+        make_row = row_factory(names)
+        for values in zip(*(group[name] for name in names)):
+            yield make_row(values)
+
+
+def export_users(path, row_group_size=100000, spec=None):
+    """Stream user_data (optionally narrowed by a QuerySpec) into ``path``."""
+    batching = __import__('1-batch_processing')
+    return write_columnar(path, batching.stream_users_in_batches(row_group_size, spec))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path')
+    parser.add_argument('--row-group-size', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = export_users(args.path, args.row_group_size)
+    footer = read_footer(args.path)
+    print(f"Exported {rows} rows in {len(footer['row_groups'])} row groups to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,9 +5,10 @@ import os
 from seed import (
     connect_db,
     create_database,
+    database_exists,
     connect_to_prodev,
     create_table,
-    insert_data,
+    bulk_insert_data,
 )
 
 
@@ -15,7 +16,7 @@ def main():
     # 1) connect to MySQL server
     connection = connect_db()
     if not connection:
-        print("Could not connect to MySQL server. Check credentials and server status.")
+        print("Could not connect to the database server. Check credentials and server status.")
         return
 
     # 2) create the database if needed
@@ -32,14 +33,12 @@ def main():
     # 4) create table and seed data
     create_table(connection)
     csv_path = os.path.join(os.path.dirname(__file__), 'user_data.csv')
-    insert_data(connection, csv_path)
+    bulk_insert_data(connection, csv_path)
 
     # 5) verify database exists and show first 5 rows
     cursor = connection.cursor()
     try:
-        cursor.execute("SELECT SCHEMA_NAME FROM INFORMATION_SCHEMA.SCHEMATA WHERE SCHEMA_NAME = 'ALX_prodev';")
-        result = cursor.fetchone()
-        if result:
+        if database_exists(connection):
             print("Database ALX_prodev is present ")
 
         cursor.execute("SELECT user_id, name, email, age FROM user_data LIMIT 5;")
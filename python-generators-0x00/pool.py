@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""Small thread-safe connection pool used by seed.get_pool()."""
+import os
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the timeout."""
+
+
+class ConnectionPool:
+    """Keep up to ``size`` idle connections, allow ``max_overflow`` extra.
+
+    ``factory`` opens a new connection (or returns None on failure) and
+    ``ping`` tells whether an idle connection is still usable.
+    """
+
+    def __init__(self, factory, size=5, max_overflow=10, idle_timeout=300.0,
+                 pre_ping=True, timeout=30.0, ping=None):
+        self.factory = factory
+        self.size = size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+        self.timeout = timeout
+        self.ping = ping or (lambda conn: conn.is_connected())
+        self._lock = threading.Condition()
+        self._inherited = []
+        self._idle = deque()
+        self._borrowed = set()
+        self._reset()
+
+    def _reset(self):
+        # a child keeps the parent's idle connections referenced and never
+        # closes them: collecting them could close sockets the parent uses
+        self._inherited.extend(conn for conn, _ in self._idle)
+        # ids of connections still borrowed at fork(), released later in the child
+        self._parent_borrowed = self._borrowed
+        self._borrowed = set()
+        self._pid = os.getpid()
+        self._idle = deque()
+        self._open = 0
+        self.checkouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.wait_time = 0.0
+
+    def _check_pid(self):
+        # connections inherited over fork() belong to the parent
+        if self._pid != os.getpid():
+            self._reset()
+
+    def acquire(self):
+        """Borrow a connection; returns None if one cannot be opened."""
+        start = time.perf_counter()
+        with self._lock:
+            self._check_pid()
+            while True:
+                while self._idle:
+                    conn, released_at = self._idle.pop()
+                    if self._usable(conn, released_at):
+                        self._record_checkout(conn, start)
+                        return conn
+                    self._close(conn)
+                if self._open < self.size + self.max_overflow:
+                    self._open += 1
+                    break
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"no connection available after {self.timeout:.1f}s")
+                self._lock.wait(remaining)
+
+        conn = self.factory()
+        with self._lock:
+            if conn is None:
+                self._open -= 1
+                self._lock.notify()
+                return None
+            self.created += 1
+            self._record_checkout(conn, start)
+        return conn
+
+    def release(self, conn, discard=False):
+        """Give a connection back; ``discard`` closes it instead."""
+        if conn is None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or id(conn) in self._parent_borrowed:
+                # borrowed before fork(): the parent still owns it, so not
+                # even a ROLLBACK may go out on its socket
+                self._parent_borrowed.discard(id(conn))
+                self._inherited.append(conn)
+                return
+            self._borrowed.discard(id(conn))
+        if not discard:
+            try:
+                # drop the read snapshot so the next borrower sees fresh data
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._lock:
+            if discard or len(self._idle) >= self.size:
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._lock:
+            self._check_pid()
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            self._check_pid()
+            return {
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'wait_time': self.wait_time,
+                'open': self._open,
+                'idle': len(self._idle),
+            }
+
+    def _usable(self, conn, released_at):
+        if self.idle_timeout and time.monotonic() - released_at > self.idle_timeout:
+            return False
+        if self.pre_ping:
+            try:
+                return bool(self.ping(conn))
+            except Exception:
+                return False
+        return True
+
+    def _record_checkout(self, conn, start):
+        self._borrowed.add(id(conn))
+        self.checkouts += 1
+        self.wait_time += time.perf_counter() - start
+
+    def _close(self, conn):
+        # caller holds the lock
+        self._open -= 1
+        self.discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
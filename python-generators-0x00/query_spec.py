@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compile filter/projection/ordering specs into parameterized SQL."""
+
+USER_COLUMNS = ('user_id', 'name', 'email', 'age')
+
+OPERATORS = {
+    '=': '=',
+    '!=': '<>',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>=',
+    'like': 'LIKE',
+    'in': 'IN',
+}
+
+
+class QuerySpec:
+    """Describe which rows and columns a generator should fetch.
+
+    filters:  iterable of (column, operator, value) tuples, ANDed together
+    columns:  column names to select, defaults to every user_data column
+    order_by: column name, or a list of them; prefix with '-' for DESC
+    """
+
+    def __init__(self, filters=(), columns=None, order_by=None, limit=None):
+        self.filters = list(filters)
+        self.columns = list(columns) if columns else list(USER_COLUMNS)
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        self.order_by = list(order_by or [])
+        self.limit = limit
+
+        for column in self.columns:
+            _check_column(column)
+        for column, op, _ in self.filters:
+            _check_column(column)
+            if op.lower() not in OPERATORS:
+                raise ValueError(f"Unsupported operator: {op!r}")
+        for column in self.order_by:
+            _check_column(column.lstrip('-'))
+
+    def where(self, column, op, value):
+        """Return a copy of this spec with one more filter."""
+        return QuerySpec(self.filters + [(column, op, value)], self.columns,
+                         self.order_by, self.limit)
+
+    def where_clause(self):
+        """Return (' WHERE ...', params) for the filters, or ('', ())."""
+        params = []
+        clauses = []
+        for column, op, value in self.filters:
+            op = OPERATORS[op.lower()]
+            if op == 'IN':
+                values = list(value)
+                if not values:
+                    # nothing can match an empty IN list
+                    clauses.append("1 = 0")
+                    continue
+                clauses.append(f"{column} IN ({', '.join(['%s'] * len(values))})")
+                params.extend(values)
+            else:
+                clauses.append(f"{column} {op} %s")
+                params.append(value)
+        if not clauses:
+            return "", ()
+        return " WHERE " + " AND ".join(clauses), tuple(params)
+
+    def compile(self, table='user_data'):
+        """Return (sql, params) ready for cursor.execute()."""
+        where, params = self.where_clause()
+        sql = f"SELECT {', '.join(self.columns)} FROM {table}{where}"
+        params = list(params)
+
+        if self.order_by:
+            terms = [f"{c[1:]} DESC" if c.startswith('-') else c for c in self.order_by]
+            sql += " ORDER BY " + ", ".join(terms)
+
+        if self.limit is not None:
+            sql += " LIMIT %s"
+            params.append(int(self.limit))
+
+        return sql, tuple(params)
+
+
+def _check_column(column):
+    # column names are interpolated into SQL, so only known ones are allowed
+    if column not in USER_COLUMNS:
+        raise ValueError(f"Unknown user_data column: {column!r}")
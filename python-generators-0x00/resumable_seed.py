@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Resumable, checkpointed loading of large user CSVs.
+
+The file is split into byte ranges that start on line boundaries. Each
+range is loaded in chunks; every chunk is inserted and its checkpoint (byte
+offset and line number inside the range) is updated in the same transaction,
+so after a crash a restart picks up right after the last committed chunk.
+Ranges can be loaded concurrently by worker processes.
+
+Lines are parsed with csv_mmap, so quoted fields must not contain line
+breaks (user_data.csv never does).
+
+Usage: ./resumable_seed.py [csv_file] [--workers N] [--chunk-size N]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+import uuid
+
+import seed
+from csv_mmap import ParseStats, iter_batches
+
+INSERT_USER = "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+
+
+def create_checkpoint_table(connection) -> None:
+    """Create the seed_checkpoint side table if it does not exist."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS seed_checkpoint ("
+            "source VARCHAR(255) NOT NULL,"
+            "range_start BIGINT NOT NULL,"
+            "range_end BIGINT NOT NULL,"
+            "byte_offset BIGINT NOT NULL,"
+            "line_number BIGINT NOT NULL,"
+            "done INT NOT NULL DEFAULT 0,"
+            "PRIMARY KEY (source, range_start)"
+            ")"
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def split_byte_ranges(path, parts):
+    """Split the data lines of ``path`` into ``parts`` byte ranges.
+
+    Every range starts at the beginning of a line; the header is skipped.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        data_start = f.tell()
+        step = max((size - data_start) // max(parts, 1), 1)
+        bounds = [data_start]
+        for i in range(1, parts):
+            f.seek(max(data_start + i * step, bounds[-1]))
+            if f.tell() > data_start:
+                # finish the line we landed in
+                f.seek(f.tell() - 1)
+                f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def plan_ranges(connection, source, path, parts):
+    """Return this source's (start, end) ranges, reusing a saved plan."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT range_start, range_end FROM seed_checkpoint WHERE source = %s ORDER BY range_start",
+            (source,))
+        ranges = [(int(start), int(end)) for start, end in cursor.fetchall()]
+        if ranges:
+            # restarting with another worker count must not move the ranges
+            return ranges
+
+        ranges = split_byte_ranges(path, parts)
+        cursor.executemany(
+            "INSERT IGNORE INTO seed_checkpoint (source, range_start, range_end, byte_offset, line_number, done) "
+            "VALUES (%s, %s, %s, %s, 0, 0)",
+            [(source, start, end, start) for start, end in ranges])
+        connection.commit()
+        return ranges
+    finally:
+        cursor.close()
+
+
+def load_range(path, source, range_start, chunk_size=10000):
+    """Load one byte range from its last checkpoint.
+
+    Returns a dict with rows inserted and the time spent parsing (plus the
+    bytes parsed) separately from the time spent inserting.
+    """
+    result = {'inserted': 0, 'parse_bytes': 0, 'parse_seconds': 0.0, 'insert_seconds': 0.0}
+    connection = seed.connect_to_prodev()
+    if not connection:
+        raise RuntimeError("could not connect to ALX_prodev")
+
+    cursor = connection.cursor()
+    parse_stats = ParseStats()
+    try:
+        cursor.execute(
+            "SELECT range_end, byte_offset, line_number, done FROM seed_checkpoint "
+            "WHERE source = %s AND range_start = %s",
+            (source, range_start))
+        range_end, offset, line_number, done = (int(v) for v in cursor.fetchone())
+        if done:
+            return result
+
+        for rows, offset, lines in iter_batches(path, chunk_size, offset, range_end, parse_stats):
+            line_number += lines
+            began = time.perf_counter()
+            if rows:
+                cursor.executemany(INSERT_USER, [(str(uuid.uuid4()),) + row for row in rows])
+                result['inserted'] += max(cursor.rowcount, 0)
+            cursor.execute(
+                "UPDATE seed_checkpoint SET byte_offset = %s, line_number = %s, done = %s "
+                "WHERE source = %s AND range_start = %s",
+                (offset, line_number, int(offset >= range_end), source, range_start))
+            connection.commit()
+            result['insert_seconds'] += time.perf_counter() - began
+
+        # an empty tail never reaches the loop body
+        cursor.execute(
+            "UPDATE seed_checkpoint SET done = 1 WHERE source = %s AND range_start = %s",
+            (source, range_start))
+        connection.commit()
+    except seed.get_backend().Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+    result['parse_bytes'] = parse_stats.bytes
+    result['parse_seconds'] = parse_stats.seconds
+    return result
+
+
+def _load_range_task(args):
+    return load_range(*args)
+
+
+def resumable_insert_data(data, workers=1, chunk_size=10000) -> dict:
+    """Load ``data`` into user_data, resuming from any saved checkpoints.
+
+    Returns a dict with the rows inserted by this run and its rows/s rate.
+    """
+    if not os.path.exists(data):
+        raise FileNotFoundError(f"CSV file not found: {data}")
+
+    source = os.path.abspath(data)
+    connection = seed.connect_to_prodev()
+    if not connection:
+        raise RuntimeError("could not connect to ALX_prodev")
+    try:
+        seed.create_table(connection)
+        create_checkpoint_table(connection)
+        ranges = plan_ranges(connection, source, data, workers)
+    finally:
+        connection.close()
+
+    start = time.perf_counter()
+    tasks = [(data, source, range_start, chunk_size) for range_start, _ in ranges]
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            results = list(pool.imap_unordered(_load_range_task, tasks))
+    else:
+        results = [_load_range_task(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    inserted = sum(r['inserted'] for r in results)
+    parse_bytes = sum(r['parse_bytes'] for r in results)
+    parse_seconds = sum(r['parse_seconds'] for r in results)
+    insert_seconds = sum(r['insert_seconds'] for r in results)
+    stats = {
+        'ranges': len(ranges),
+        'inserted': inserted,
+        'seconds': elapsed,
+        'rows_per_sec': inserted / elapsed if elapsed > 0 else 0.0,
+        # per-worker rates: seconds are summed across workers
+        'parse_mb_per_sec': parse_bytes / 1e6 / parse_seconds if parse_seconds > 0 else 0.0,
+        'insert_rows_per_sec': inserted / insert_seconds if insert_seconds > 0 else 0.0,
+    }
+    print(f"Inserted {inserted} new rows into user_data from {len(ranges)} ranges "
+          f"({stats['rows_per_sec']:.0f} rows/s; parse {stats['parse_mb_per_sec']:.1f} MB/s, "
+          f"insert {stats['insert_rows_per_sec']:.0f} rows/s per worker)")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('csv_file', nargs='?',
+                        default=os.path.join(os.path.dirname(__file__), 'user_data.csv'))
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    args = parser.parse_args()
+
+    conn = seed.connect_db()
+    if not conn:
+        raise SystemExit(1)
+    seed.create_database(conn)
+    conn.close()
+
+    resumable_insert_data(args.csv_file, workers=args.workers, chunk_size=args.chunk_size)
+
+
+if __name__ == '__main__':
+    main()
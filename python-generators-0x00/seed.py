@@ -1,82 +1,143 @@
 from typing import Optional
 import os
 import csv
+import threading
+import time
 import uuid
-import mysql.connector
-from mysql.connector import errorcode
+from contextlib import contextmanager
+from itertools import islice
+from backends import Connection, make_backend
+from csv_mmap import ParseStats, iter_batches
+from pool import ConnectionPool
 
 
-def connect_db() -> Optional[mysql.connector.connection_cext.CMySQLConnection]:
-    """Connect to the MySQL server (no database selected).
+_backend = None
+
+
+def get_backend():
+    """Return the active storage backend (PRODEV_BACKEND=mysql|sqlite)."""
+    global _backend
+    if _backend is None:
+        _backend = make_backend()
+    return _backend
+
+
+def use_backend(backend) -> None:
+    """Switch backends, by name or instance, and drop pooled connections."""
+    global _backend, _pool
+    if isinstance(backend, str):
+        backend = make_backend(backend)
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+        _backend = backend
+
+
+def connect_db() -> Optional[Connection]:
+    """Connect to the database server (no database selected).
 
     Uses environment variables if present. Returns a connection or None on failure.
     """
-    host = os.getenv("MYSQL_HOST", "localhost")
-    port = int(os.getenv("MYSQL_PORT", 3306))
-    user = os.getenv("MYSQL_USER", "root")
-    password = os.getenv("MYSQL_PASSWORD", "")
-
-    try:
-        conn = mysql.connector.connect(host=host, port=port, user=user, password=password)
-        return conn
-    except mysql.connector.Error as err:
-        print(f"Error connecting to MySQL server: {err}")
-        return None
+    return get_backend().connect_server()
 
 
-def create_database(connection: mysql.connector.connection_cext.CMySQLConnection) -> None:
+def create_database(connection: Connection) -> None:
     """Create the ALX_prodev database if it does not exist."""
-    cursor = connection.cursor()
     try:
-        cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;")
-        connection.commit()
-    except mysql.connector.Error as err:
+        get_backend().create_database(connection)
+    except get_backend().Error as err:
         print(f"Failed creating database: {err}")
         raise
-    finally:
-        cursor.close()
 
 
-def connect_to_prodev() -> Optional[mysql.connector.connection_cext.CMySQLConnection]:
+def database_exists(connection: Connection) -> bool:
+    """Tell whether the ALX_prodev database is present."""
+    return get_backend().database_exists(connection)
+
+
+def connect_to_prodev() -> Optional[Connection]:
     """Connect to the ALX_prodev database and return the connection."""
-    host = os.getenv("MYSQL_HOST", "localhost")
-    port = int(os.getenv("MYSQL_PORT", 3306))
-    user = os.getenv("MYSQL_USER", "root")
-    password = os.getenv("MYSQL_PASSWORD", "")
+    return get_backend().connect()
+
+
+_pool = None
+_pool_lock = threading.Lock()
 
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool of ALX_prodev connections.
+
+    Sized from MYSQL_POOL_SIZE, MYSQL_POOL_MAX_OVERFLOW,
+    MYSQL_POOL_IDLE_TIMEOUT (seconds), MYSQL_POOL_PRE_PING (0/1) and
+    MYSQL_POOL_TIMEOUT (seconds to wait for a free connection).
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                connect_to_prodev,
+                size=int(os.getenv("MYSQL_POOL_SIZE", 5)),
+                max_overflow=int(os.getenv("MYSQL_POOL_MAX_OVERFLOW", 10)),
+                idle_timeout=float(os.getenv("MYSQL_POOL_IDLE_TIMEOUT", 300)),
+                pre_ping=os.getenv("MYSQL_POOL_PRE_PING", "1") != "0",
+                timeout=float(os.getenv("MYSQL_POOL_TIMEOUT", 30)),
+                ping=get_backend().ping,
+            )
+    return _pool
+
+
+def acquire_connection():
+    """Borrow an ALX_prodev connection from the shared pool."""
+    return get_pool().acquire()
+
+
+def release_connection(connection, discard: bool = False) -> None:
+    """Return a connection borrowed with acquire_connection()."""
+    get_pool().release(connection, discard=discard)
+
+
+def close_and_release(connection, cursor) -> None:
+    """Close ``cursor``, then return ``connection`` to the pool.
+
+    If closing the cursor fails (mysql-connector raises "Unread result
+    found" for an abandoned unbuffered result) the connection is still
+    given back, but discarded instead of reused.
+    """
+    closed = False
     try:
-        conn = mysql.connector.connect(host=host, port=port, user=user, password=password, database="ALX_prodev")
-        return conn
-    except mysql.connector.Error as err:
-        print(f"Error connecting to ALX_prodev database: {err}")
-        return None
+        cursor.close()
+        closed = True
+    finally:
+        release_connection(connection, discard=not closed)
 
 
-def create_table(connection: mysql.connector.connection_cext.CMySQLConnection) -> None:
-    """Create the user_data table if it does not exist."""
-    create_table_query = (
-        "CREATE TABLE IF NOT EXISTS user_data ("
-        "user_id VARCHAR(36) NOT NULL PRIMARY KEY,"
-        "name VARCHAR(255) NOT NULL,"
-        "email VARCHAR(255) NOT NULL,"
-        "age DECIMAL(5,0) NOT NULL,"
-        "UNIQUE KEY email_unique (email)"
-        ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;"
-    )
+@contextmanager
+def pooled_connection():
+    """Context manager around acquire_connection/release_connection."""
+    connection = acquire_connection()
+    try:
+        yield connection
+    finally:
+        release_connection(connection)
 
-    cursor = connection.cursor()
+
+def pool_stats() -> dict:
+    """Checkouts, total wait time and connections created by the pool."""
+    return get_pool().stats()
+
+
+def create_table(connection: Connection) -> None:
+    """Create the user_data table if it does not exist."""
     try:
-        cursor.execute(create_table_query)
-        connection.commit()
+        get_backend().create_table(connection)
         print("Table user_data created successfully")
-    except mysql.connector.Error as err:
+    except get_backend().Error as err:
         print(f"Error creating table: {err}")
         raise
-    finally:
-        cursor.close()
 
 
-def insert_data(connection: mysql.connector.connection_cext.CMySQLConnection, data: str) -> None:
+def insert_data(connection: Connection, data: str) -> None:
     """Insert data from CSV file into user_data table.
 
     data: path to CSV file, expects header with name,email,age
@@ -119,7 +180,7 @@ def insert_data(connection: mysql.connector.connection_cext.CMySQLConnection, da
                 inserted += 1
 
         connection.commit()
-    except mysql.connector.Error as err:
+    except get_backend().Error as err:
         print(f"Error inserting data: {err}")
         connection.rollback()
         raise
@@ -129,6 +190,108 @@ def insert_data(connection: mysql.connector.connection_cext.CMySQLConnection, da
     print(f"Inserted {inserted} new rows into user_data")
 
 
+def _read_csv_rows(data: str):
+    """Yield (name, email, age) tuples for every well-formed CSV line."""
+    with open(data, newline='', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            name = row.get('name')
+            email = row.get('email')
+            age = row.get('age')
+
+            if not name or not email or age is None:
+                continue
+
+            try:
+                age_val = int(age)
+            except (ValueError, TypeError):
+                age_val = 0
+
+            yield name, email, age_val
+
+
+def _csv_batches(data: str, chunk_size: int, stats: ParseStats):
+    """csv.DictReader counterpart of csv_mmap.iter_batches."""
+    rows = _read_csv_rows(data)
+    while True:
+        began = time.perf_counter()
+        chunk = list(islice(rows, chunk_size))
+        stats.seconds += time.perf_counter() - began
+        if not chunk:
+            break
+        stats.rows += len(chunk)
+        yield chunk
+    stats.bytes = os.path.getsize(data)
+
+
+def bulk_insert_data(connection: Connection, data: str,
+                     chunk_size: int = 5000, reader: str = 'mmap') -> dict:
+    """Bulk-load the CSV file into user_data.
+
+    Streams the CSV in chunks of ``chunk_size`` rows and writes each chunk
+    with a single multi-row ``INSERT IGNORE``, committed as its own
+    transaction; an error rolls back only the current chunk. Duplicate
+    emails are dropped by the ``email_unique`` key instead of a per-row
+    existence probe, so a failed load can simply be run again.
+    ``reader`` is 'mmap' (csv_mmap, quoted fields must not span lines) or
+    'csv' (csv.DictReader).
+    Returns a dict with inserted/skipped counts, the overall rows/s rate and
+    parse (MB/s) and insert (rows/s) throughput measured separately.
+    """
+    if not os.path.exists(data):
+        raise FileNotFoundError(f"CSV file not found: {data}")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    parse_stats = ParseStats()
+    if reader == 'mmap':
+        batches = (rows for rows, _, _ in iter_batches(data, chunk_size, stats=parse_stats))
+    elif reader == 'csv':
+        batches = _csv_batches(data, chunk_size, parse_stats)
+    else:
+        raise ValueError(f"Unknown reader: {reader!r}")
+
+    insert_query = "INSERT IGNORE INTO user_data (user_id, name, email, age) VALUES (%s, %s, %s, %s)"
+    cursor = connection.cursor()
+    total = 0
+    inserted = 0
+    insert_seconds = 0.0
+    start = time.perf_counter()
+    try:
+        for rows in batches:
+            chunk = [(str(uuid.uuid4()), name, email, age) for name, email, age in rows]
+            began = time.perf_counter()
+            cursor.executemany(insert_query, chunk)
+            # one transaction per chunk keeps the journal small; reruns
+            # are safe because INSERT IGNORE skips rows already loaded
+            connection.commit()
+            insert_seconds += time.perf_counter() - began
+            total += len(chunk)
+            inserted += max(cursor.rowcount, 0)
+    except get_backend().Error as err:
+        print(f"Error inserting data: {err}")
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        'rows': total,
+        'inserted': inserted,
+        'skipped': total - inserted,
+        'seconds': elapsed,
+        'rows_per_sec': total / elapsed if elapsed > 0 else 0.0,
+        'parse_seconds': parse_stats.seconds,
+        'parse_mb_per_sec': parse_stats.mb_per_sec,
+        'insert_seconds': insert_seconds,
+        'insert_rows_per_sec': total / insert_seconds if insert_seconds > 0 else 0.0,
+    }
+    print(f"Inserted {inserted} new rows into user_data "
+          f"({stats['skipped']} duplicates skipped, {stats['rows_per_sec']:.0f} rows/s; "
+          f"parse {stats['parse_mb_per_sec']:.1f} MB/s, insert {stats['insert_rows_per_sec']:.0f} rows/s)")
+    return stats
+
+
 if __name__ == '__main__':
     # Simple CLI to run the seeding from command line
     conn = connect_db()
@@ -145,6 +308,6 @@ if __name__ == '__main__':
     create_table(conn)
     csv_path = os.path.join(os.path.dirname(__file__), 'user_data.csv')
     try:
-        insert_data(conn, csv_path)
+        bulk_insert_data(conn, csv_path)
     finally:
         conn.close()
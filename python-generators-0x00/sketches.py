@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""Approximate, bounded-memory sketches over the user streams.
+
+Every sketch has update(value), merge(other) and fixed memory:
+
+- ReservoirSample: uniform sample of k rows
+- HyperLogLog:     distinct counts, e.g. of email domains
+- KLLSketch:       quantiles, e.g. of age
+
+tap() and tap_batches() feed sketches while rows pass through to the
+consumer, so they can wrap stream_users() / stream_users_in_batches().
+"""
+import hashlib
+import math
+import random
+
+
+class ReservoirSample:
+    """Uniform random sample of up to ``k`` items (algorithm R)."""
+
+    def __init__(self, k=100, seed=None):
+        self.k = k
+        self.count = 0
+        self.items = []
+        self._random = random.Random(seed)
+
+    def update(self, item):
+        self.count += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+        else:
+            slot = self._random.randrange(self.count)
+            if slot < self.k:
+                self.items[slot] = item
+
+    def merge(self, other):
+        """Combine two samples into a uniform sample of the union."""
+        ours, theirs = list(self.items), list(other.items)
+        left, right = self.count, other.count
+        merged = []
+        while len(merged) < self.k and (ours or theirs):
+            # each pick comes from a side in proportion to the rows it saw
+            if theirs and (not ours or self._random.randrange(left + right) >= left):
+                merged.append(theirs.pop(self._random.randrange(len(theirs))))
+                right -= 1
+            else:
+                merged.append(ours.pop(self._random.randrange(len(ours))))
+                left -= 1
+        self.items = merged
+        self.count += other.count
+        return self
+
+
+def _hash64(value):
+    if not isinstance(value, bytes):
+        value = str(value).encode('utf-8')
+    # stable across processes, unlike hash(), so states can be merged
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Distinct-count estimate in 2**p one-byte registers.
+
+    Standard error is about 1.04 / sqrt(2**p): 1.6% at the default p=12.
+    """
+
+    def __init__(self, p=12):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def update(self, value):
+        x = _hash64(value)
+        index = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLogs with different p")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # linear counting is more accurate while many registers are empty
+            return m * math.log(m / zeros)
+        return raw
+
+
+class KLLSketch:
+    """Quantile sketch keeping O(k) items (Karnin, Lang and Liberty).
+
+    Rank error shrinks roughly as 1 / k; the default k=200 stays around 1%.
+    """
+
+    def __init__(self, k=200, c=2 / 3, seed=None):
+        self.k = k
+        self.c = c
+        self.compactors = [[]]
+        self.size = 0
+        self.count = 0
+        self._random = random.Random(seed)
+        self._update_max_size()
+
+    def _capacity(self, height):
+        depth = len(self.compactors) - height - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _update_max_size(self):
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def update(self, value):
+        self.compactors[0].append(value)
+        self.size += 1
+        self.count += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def _compress(self):
+        while self.size >= self.max_size:
+            for height, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(height):
+                    if height + 1 >= len(self.compactors):
+                        self.compactors.append([])
+                        self._update_max_size()
+                    items.sort()
+                    # an odd item out stays behind at this level
+                    keep = [items.pop()] if len(items) % 2 else []
+                    promoted = items[self._random.randrange(2)::2]
+                    self.compactors[height + 1].extend(promoted)
+                    self.compactors[height] = keep
+                    self.size += len(promoted) - len(items)
+                    break
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        self._update_max_size()
+        for height, items in enumerate(other.compactors):
+            self.compactors[height].extend(items)
+        self.size = sum(len(items) for items in self.compactors)
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _weighted(self):
+        pairs = [(value, 1 << height)
+                 for height, items in enumerate(self.compactors) for value in items]
+        pairs.sort(key=lambda pair: pair[0])
+        return pairs
+
+    def quantile(self, q):
+        """Value at quantile ``q`` (0..1), or None if nothing was added."""
+        pairs = self._weighted()
+        if not pairs:
+            return None
+        total = sum(weight for _, weight in pairs)
+        target = q * total
+        seen = 0
+        for value, weight in pairs:
+            seen += weight
+            if seen >= target:
+                return value
+        return pairs[-1][0]
+
+    def rank(self, value):
+        """Approximate fraction of items <= ``value``."""
+        pairs = self._weighted()
+        total = sum(weight for _, weight in pairs)
+        if not total:
+            return 0.0
+        return sum(weight for v, weight in pairs if v <= value) / total
+
+    def stored_items(self):
+        return sum(len(items) for items in self.compactors)
+
+
+def email_domain(row):
+    """Domain part of a row's email, for distinct-domain counts."""
+    return row.get('email', '').rpartition('@')[2].lower()
+
+
+def tap(rows, sketch, key=None):
+    """Yield ``rows`` unchanged while feeding ``key(row)`` to ``sketch``."""
+    for row in rows:
+        sketch.update(key(row) if key else row)
+        yield row
+
+
+def tap_batches(batches, sketch, key=None):
+    """tap() for the list-of-rows batches of stream_users_in_batches."""
+    for batch in batches:
+        for row in batch:
+            sketch.update(key(row) if key else row)
+        yield batch
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Accuracy-versus-memory tests for the sketches module.
+
+Each sketch is checked against the exact answer on synthetic data, at more
+than one memory setting, and through merge() of partial states.
+"""
+import random
+import unittest
+
+from sketches import (HyperLogLog, KLLSketch, ReservoirSample, email_domain,
+                      tap, tap_batches)
+
+
+def max_rank_error(sketch, data):
+    """Largest |estimated rank - true rank| over the deciles of ``data``."""
+    ordered = sorted(data)
+    errors = []
+    for i in range(1, 10):
+        q = i / 10
+        errors.append(abs(sketch.rank(ordered[int(q * len(ordered)) - 1]) - q))
+    return max(errors)
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """Test cases for HyperLogLog."""
+
+    def test_error_shrinks_with_registers(self):
+        """Estimates stay within 3 standard errors for every precision."""
+        distinct = 50000
+        for p in (8, 10, 12, 14):
+            hll = HyperLogLog(p)
+            for i in range(distinct):
+                hll.update(f"domain{i}.com")
+            bound = 3 * 1.04 / (1 << p) ** 0.5
+            with self.subTest(p=p, registers=len(hll.registers)):
+                self.assertLess(abs(hll.estimate() - distinct) / distinct, bound)
+
+    def test_small_cardinality(self):
+        """Duplicates are ignored and small counts are near exact."""
+        hll = HyperLogLog()
+        for i in range(1000):
+            hll.update(f"user{i % 37}")
+        self.assertAlmostEqual(hll.estimate(), 37, delta=1)
+
+    def test_merge_matches_union(self):
+        """Merging two sketches equals sketching the union."""
+        left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(20000):
+            (left if i % 2 else right).update(i)
+            union.update(i)
+        self.assertEqual(left.merge(right).registers, union.registers)
+
+    def test_email_domains(self):
+        """Distinct email domains can be counted through tap()."""
+        rows = [{'email': f"u{i}@Host{i % 25}.com"} for i in range(5000)]
+        hll = HyperLogLog()
+        self.assertEqual(list(tap(rows, hll, email_domain)), rows)
+        self.assertAlmostEqual(hll.estimate(), 25, delta=1)
+
+
+class TestKLLSketch(unittest.TestCase):
+    """Test cases for KLLSketch."""
+
+    def setUp(self):
+        """Synthetic ages with a skewed distribution."""
+        rng = random.Random(7)
+        self.ages = [min(120, int(rng.expovariate(1 / 35))) + rng.random()
+                     for _ in range(100000)]
+
+    def test_error_shrinks_with_k(self):
+        """Larger k stores more items and gives smaller rank error."""
+        results = []
+        for k in (50, 200, 800):
+            sketch = KLLSketch(k, seed=1)
+            for age in self.ages:
+                sketch.update(age)
+            results.append((sketch.stored_items(), max_rank_error(sketch, self.ages)))
+            with self.subTest(k=k):
+                self.assertLess(results[-1][1], 4.0 / k)
+                self.assertLess(sketch.stored_items(), 4 * k)
+        self.assertLess(results[0][0], results[-1][0])
+        self.assertGreater(results[0][1], results[-1][1])
+
+    def test_merge(self):
+        """Merged partition sketches keep the same accuracy bound."""
+        merged = KLLSketch(200, seed=1)
+        for part in range(4):
+            partial = KLLSketch(200, seed=part + 2)
+            for age in self.ages[part::4]:
+                partial.update(age)
+            merged.merge(partial)
+        self.assertEqual(merged.count, len(self.ages))
+        self.assertLess(max_rank_error(merged, self.ages), 0.02)
+
+    def test_quantile(self):
+        """The median estimate is close to the exact median."""
+        sketch = KLLSketch(seed=1)
+        for age in self.ages:
+            sketch.update(age)
+        ordered = sorted(self.ages)
+        self.assertAlmostEqual(sketch.rank(sketch.quantile(0.5)), 0.5, delta=0.02)
+        self.assertLessEqual(ordered[0], sketch.quantile(0.5))
+        self.assertIsNone(KLLSketch().quantile(0.5))
+
+
+class TestReservoirSample(unittest.TestCase):
+    """Test cases for ReservoirSample."""
+
+    def test_sample_is_bounded_and_unbiased(self):
+        """The sample size is capped at k and its mean tracks the data."""
+        sample = ReservoirSample(2000, seed=3)
+        batches = [list(range(i, i + 1000)) for i in range(0, 100000, 1000)]
+        for _ in tap_batches(batches, sample):
+            pass
+        self.assertEqual(len(sample.items), 2000)
+        self.assertEqual(sample.count, 100000)
+        self.assertAlmostEqual(sum(sample.items) / 2000, 49999.5, delta=2500)
+
+    def test_merge_weights_by_count(self):
+        """A merged sample draws from each side in proportion to its count."""
+        big, small = ReservoirSample(1000, seed=4), ReservoirSample(1000, seed=5)
+        for i in range(90000):
+            big.update(('big', i))
+        for i in range(10000):
+            small.update(('small', i))
+        big.merge(small)
+        from_small = sum(1 for side, _ in big.items if side == 'small')
+        self.assertEqual(len(big.items), 1000)
+        self.assertEqual(big.count, 100000)
+        self.assertAlmostEqual(from_small, 100, delta=40)
+
+
+if __name__ == '__main__':
+    unittest.main()
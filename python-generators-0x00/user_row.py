@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Compact row type for user_data results."""
+from query_spec import USER_COLUMNS
+
+_FIELDS = frozenset(USER_COLUMNS)
+
+
+class UserRow:
+    """One user_data row stored in __slots__ instead of a per-row dict.
+
+    Supports attribute access (``row.age``) as well as the read-only
+    mapping calls consumers already use on dict rows (``row['age']``,
+    ``row.get('age')``, ``dict(row)``). Columns that were not selected are
+    simply absent.
+    """
+
+    __slots__ = USER_COLUMNS
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    @classmethod
+    def from_columns(cls, names, values):
+        """Build a row holding only the given columns."""
+        row = cls.__new__(cls)
+        for name, value in zip(names, values):
+            setattr(row, name, value)
+        return row
+
+    def keys(self):
+        return [name for name in self.__slots__ if hasattr(self, name)]
+
+    def values(self):
+        return [getattr(self, name) for name in self.keys()]
+
+    def items(self):
+        return [(name, getattr(self, name)) for name in self.keys()]
+
+    def get(self, key, default=None):
+        if key not in _FIELDS:
+            return default
+        return getattr(self, key, default)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key not in _FIELDS:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in _FIELDS and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, (UserRow, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        # print like the dict rows this type replaces
+        return repr(self.to_dict())
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+def row_factory(column_names):
+    """Return a function turning raw cursor tuples into UserRow objects."""
+    names = tuple(column_names)
+    if names == USER_COLUMNS:
+        return lambda values: UserRow(*values)
+    return lambda values: UserRow.from_columns(names, values)